@@ -1,14 +1,15 @@
 #!/usr/bin/env python
-import sqlite3
 import os
+import sys
+from db_utils import DB_PATH, get_conn
 
 def check_database():
-    db_path = 'db.sqlite3'
+    db_path = DB_PATH
     if not os.path.exists(db_path):
         print("Database file does not exist!")
         return
     
-    conn = sqlite3.connect(db_path)
+    conn = get_conn(db_path)
     cursor = conn.cursor()
     
     # Get all table names
@@ -16,14 +17,12 @@ def check_database():
     tables = cursor.fetchall()
     
     print("All tables in database:")
-    for table in tables:
-        print(f"  - {table[0]}")
+    sys.stdout.write("".join(f"  - {table[0]}\n" for table in tables))
     
     # Check specifically for payment tables
     payment_tables = [t[0] for t in tables if t[0].startswith('payments_')]
     print(f"\nPayment tables ({len(payment_tables)}):")
-    for table in payment_tables:
-        print(f"  - {table}")
+    sys.stdout.write("".join(f"  - {table}\n" for table in payment_tables))
     
     # Check if phonepayment table exists
     if 'payments_phonepayment' in [t[0] for t in tables]:
@@ -33,12 +32,9 @@ def check_database():
         cursor.execute("PRAGMA table_info(payments_phonepayment);")
         columns = cursor.fetchall()
         print("Columns:")
-        for col in columns:
-            print(f"  - {col[1]} ({col[2]})")
+        sys.stdout.write("".join(f"  - {col[1]} ({col[2]})\n" for col in columns))
     else:
         print("\n✗ payments_phonepayment table does NOT exist")
-    
-    conn.close()
 
 if __name__ == "__main__":
     check_database()
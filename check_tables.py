@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import os
+import sys
 import django
 
 # Setup Django
@@ -22,8 +23,7 @@ def check_tables():
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'payments_%';")
         tables = cursor.fetchall()
         print("\nAll payment tables:")
-        for table in tables:
-            print(f"  - {table[0]}")
+        sys.stdout.write("".join(f"  - {table[0]}\n" for table in tables))
 
 if __name__ == "__main__":
     try:
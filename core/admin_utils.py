@@ -0,0 +1,28 @@
+"""
+Helpers shared by the apps' ModelAdmin classes
+"""
+from functools import lru_cache
+
+from django.urls import reverse
+
+
+def is_changelist(request):
+    """True when the admin request is for a model's list page"""
+    match = getattr(request, 'resolver_match', None)
+    return bool(match and match.url_name and match.url_name.endswith('_changelist'))
+
+
+@lru_cache(maxsize=None)
+def _change_url_template(viewname):
+    # Resolve once with a placeholder pk, then format ids into it
+    return reverse(viewname, args=[0]).replace('/0/', '/{}/')
+
+
+def admin_change_url(viewname, pk):
+    """
+    reverse(viewname, args=[pk]) without walking the resolver per row.
+
+    Works for admin change views and any other URL whose only argument is
+    an integer path segment.
+    """
+    return _change_url_template(viewname).format(pk)
@@ -0,0 +1,36 @@
+"""
+Database helpers shared across apps
+"""
+from itertools import islice
+
+# Keeps each INSERT well under SQLite/Postgres bound-parameter limits
+DEFAULT_BATCH_SIZE = 1000
+
+# Applied to every new SQLite connection, both Django's (core.signals) and
+# the raw ones opened by the standalone helper scripts (db_utils.py)
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'mmap_size=268435456',
+    'cache_size=-32000',
+    'temp_store=MEMORY',
+)
+
+
+def bulk_insert(model, objs, batch=DEFAULT_BATCH_SIZE, ignore_conflicts=True):
+    """
+    Insert objs in fixed-size chunks.
+
+    objs may be any iterable (including a generator), so callers never
+    have to materialize the full list in memory. Returns the number of
+    objects handed to bulk_create.
+    """
+    iterator = iter(objs)
+    total = 0
+    while True:
+        chunk = list(islice(iterator, batch))
+        if not chunk:
+            break
+        model.objects.bulk_create(chunk, batch_size=batch, ignore_conflicts=ignore_conflicts)
+        total += len(chunk)
+    return total
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.recommendations import build_product_similarity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product similarity table used by "customers also viewed" (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20, help='Neighbours stored per product')
+
+    def handle(self, *args, **options):
+        count = build_product_similarity(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} product similarity rows'))
@@ -1,20 +1,33 @@
 """
 AI-Powered Recommendation Engine
 """
+import logging
+import threading
 import numpy as np
 from django.db.models import Count, Avg, Q
 from django.contrib.auth.models import User
 from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 import json
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on background recommendation refreshes per process. They run in
+# daemon threads, so a refresh in flight when the worker is killed is simply
+# lost; its lock key expires and a later request starts a new one.
+MAX_BACKGROUND_REFRESHES = 4
+_refresh_slots = threading.BoundedSemaphore(MAX_BACKGROUND_REFRESHES)
+
 
 class RecommendationEngine:
     """Advanced AI-powered recommendation system"""
     
     def __init__(self):
         self.cache_timeout = 3600  # 1 hour
+        self.stale_timeout = 86400  # serve stale user recommendations for up to a day
         self.min_interactions = 3
         self.similarity_threshold = 0.3
     
@@ -23,23 +36,60 @@ class RecommendationEngine:
         if not user or not user.is_authenticated:
             return self.get_trending_products(limit)
         
-        cache_key = f'user_recommendations_{user.id}_{algorithm}_{limit}'
-        recommendations = cache.get(cache_key)
+        # Stale-while-revalidate: the data key outlives the fresh key, so a
+        # stale result is served immediately while a refresh runs off-thread
+        base_key = f'user_recommendations_{user.id}_{algorithm}_{limit}'
+        recommendations = cache.get(f'{base_key}_data')
         
         if recommendations is None:
-            if algorithm == 'collaborative':
-                recommendations = self._collaborative_filtering(user, limit)
-            elif algorithm == 'content':
-                recommendations = self._content_based_filtering(user, limit)
-            elif algorithm == 'hybrid':
-                recommendations = self._hybrid_recommendations(user, limit)
+            # Cold start, compute inline
+            recommendations = self._refresh_user_recommendations(user, limit, algorithm)
+        elif cache.get(f'{base_key}_fresh') is None and cache.add(f'{base_key}_lock', True, 300):
+            if _refresh_slots.acquire(blocking=False):
+                threading.Thread(
+                    target=self._refresh_user_recommendations_async,
+                    args=(user.id, limit, algorithm),
+                    daemon=True,
+                ).start()
             else:
-                recommendations = self.get_trending_products(limit)
-            
-            cache.set(cache_key, recommendations, self.cache_timeout)
+                # All refresh slots busy, keep serving stale data and let a later request retry
+                cache.delete(f'{base_key}_lock')
         
         return recommendations
     
+    def _compute_user_recommendations(self, user, limit, algorithm):
+        if algorithm == 'collaborative':
+            return self._collaborative_filtering(user, limit)
+        elif algorithm == 'content':
+            return self._content_based_filtering(user, limit)
+        elif algorithm == 'hybrid':
+            return self._hybrid_recommendations(user, limit)
+        return self.get_trending_products(limit)
+    
+    def _refresh_user_recommendations(self, user, limit, algorithm):
+        """Recompute recommendations and store both the data and fresh keys"""
+        base_key = f'user_recommendations_{user.id}_{algorithm}_{limit}'
+        recommendations = list(self._compute_user_recommendations(user, limit, algorithm))
+        cache.set(f'{base_key}_data', recommendations, self.stale_timeout)
+        cache.set(f'{base_key}_fresh', True, self.cache_timeout)
+        return recommendations
+    
+    def _refresh_user_recommendations_async(self, user_id, limit, algorithm):
+        # Takes the id rather than the request's user instance, and reloads it
+        # on this thread's own database connection, which is closed when done
+        try:
+            user = User.objects.get(pk=user_id)
+            self._refresh_user_recommendations(user, limit, algorithm)
+        except Exception:
+            logger.exception(
+                'Background recommendation refresh failed for user %s (%s, limit %s)',
+                user_id, algorithm, limit
+            )
+        finally:
+            cache.delete(f'user_recommendations_{user_id}_{algorithm}_{limit}_lock')
+            connection.close()
+            _refresh_slots.release()
+    
     def get_product_recommendations(self, product, limit=8):
         """Get products similar to the given product"""
         cache_key = f'product_recommendations_{product.id}_{limit}'
@@ -132,28 +182,20 @@ class RecommendationEngine:
     
     def get_customers_also_viewed(self, product, limit=8):
         """Get products that customers also viewed"""
-        from products.models import Product
+        from products.models import Product, ProductSimilarity
         
         cache_key = f'also_viewed_{product.id}_{limit}'
         recommendations = cache.get(cache_key)
         
         if recommendations is None:
-            try:
-                # Get users who viewed this product
-                users_who_viewed = product.viewed_by.values_list('user_id', flat=True)
-                
-                # Get other products viewed by these users
-                related_products = Product.objects.filter(
-                    viewed_by__user_id__in=users_who_viewed,
-                    is_active=True
-                ).exclude(
-                    id=product.id
-                ).annotate(
-                    view_count=Count('viewed_by')
-                ).order_by('-view_count', '-views_count')[:limit]
-                
-                recommendations = related_products
-            except:
+            # Read the offline item-item similarity table (see build_product_similarity)
+            similarities = ProductSimilarity.objects.filter(
+                product_a=product,
+                product_b__is_active=True
+            ).select_related('product_b').order_by('-score')[:limit]
+            recommendations = [similarity.product_b for similarity in similarities]
+            
+            if not recommendations:
                 recommendations = Product.objects.filter(
                     category=product.category,
                     is_active=True
@@ -272,33 +314,26 @@ class RecommendationEngine:
         """Find products similar to the given product"""
         from products.models import Product
         
-        # Same category products
-        category_products = Product.objects.filter(
-            category=product.category,
-            is_active=True
-        ).exclude(id=product.id)
-        
-        # Same brand products
-        brand_products = Product.objects.filter(
-            brand=product.brand,
-            is_active=True
-        ).exclude(id=product.id) if product.brand else Product.objects.none()
-        
-        # Price range similarity
-        price_range = product.price * 0.3  # 30% price variance
-        price_similar = Product.objects.filter(
+        # Same category, same brand or similar price (30% variance),
+        # as a single OR filter so no DISTINCT pass is needed
+        price_range = product.price * Decimal('0.3')
+        similarity = Q(category_id=product.category_id) | Q(
             price__gte=product.price - price_range,
             price__lte=product.price + price_range,
-            is_active=True
-        ).exclude(id=product.id)
+        )
+        if product.brand_id:
+            similarity |= Q(brand_id=product.brand_id)
         
         # Combine with weighted scoring
-        similar_products = (category_products | brand_products | price_similar).distinct().annotate(
+        similar_products = Product.objects.filter(
+            similarity,
+            is_active=True
+        ).exclude(id=product.id).annotate(
             avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
+            num_reviews=Count('reviews')
         ).order_by(
             '-avg_rating',
-            '-review_count',
+            '-num_reviews',
             '-views_count'
         )[:limit]
         
@@ -334,6 +369,57 @@ class RecommendationEngine:
             pass
 
 
+def build_product_similarity(top_k=20):
+    """
+    Rebuild ProductSimilarity from RecentlyViewed.
+    
+    Item-item cosine similarity is V.T @ V over the binary user x product
+    view matrix V, normalised by each product's view count. Only the top_k
+    neighbours of every product are stored. Returns the number of rows written.
+    """
+    from scipy import sparse
+    from django.db import transaction
+    from products.models import RecentlyViewed, ProductSimilarity
+    from core.db_utils import bulk_insert
+    
+    views = np.array(
+        list(RecentlyViewed.objects.values_list('user_id', 'product_id').iterator()),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    
+    user_ids, user_idx = np.unique(views[:, 0], return_inverse=True)
+    product_ids, product_idx = np.unique(views[:, 1], return_inverse=True)
+    
+    matrix = sparse.csr_matrix(
+        (np.ones(len(views), dtype=np.float32), (user_idx, product_idx)),
+        shape=(len(user_ids), len(product_ids))
+    )
+    # Binary views: the diagonal of the co-occurrence matrix is each product's view count
+    co_views = (matrix.T @ matrix).tocsr()
+    norms = np.sqrt(co_views.diagonal())
+    
+    def similarities():
+        for row in range(co_views.shape[0]):
+            start, end = co_views.indptr[row], co_views.indptr[row + 1]
+            cols = co_views.indices[start:end]
+            scores = co_views.data[start:end] / (norms[row] * norms[cols])
+            keep = cols != row
+            cols, scores = cols[keep], scores[keep]
+            if len(cols) > top_k:
+                top = np.argpartition(-scores, top_k)[:top_k]
+                cols, scores = cols[top], scores[top]
+            for col, score in zip(cols, scores):
+                yield ProductSimilarity(
+                    product_a_id=int(product_ids[row]),
+                    product_b_id=int(product_ids[col]),
+                    score=float(score)
+                )
+    
+    with transaction.atomic():
+        ProductSimilarity.objects.all().delete()
+        return bulk_insert(ProductSimilarity, similarities())
+
+
 class PersonalizationEngine:
     """Advanced personalization features"""
     
@@ -380,31 +466,22 @@ class PersonalizationEngine:
         try:
             from products.models import Category
             
-            # Get user's purchase history categories
-            user_categories = Category.objects.filter(
-                products__orderitem__order__user=user
-            ).annotate(
-                purchase_count=Count('products__orderitem')
-            ).order_by('-purchase_count')[:3]
-            
-            # Get trending categories
-            trending_categories = Category.objects.filter(
-                is_featured=True
-            )[:3]
-            
-            # Combine and deduplicate
-            all_categories = list(user_categories) + list(trending_categories)
-            seen_ids = set()
-            unique_categories = []
+            cache_key = f'catrec:{user.id}'
+            categories = cache.get(cache_key)
             
-            for category in all_categories:
-                if category.id not in seen_ids:
-                    unique_categories.append(category)
-                    seen_ids.add(category.id)
-                    if len(unique_categories) >= 6:
-                        break
+            if categories is None:
+                # Purchased categories first, then featured ones, in one query
+                categories = list(Category.objects.annotate(
+                    purchase_count=Count(
+                        'products__orderitem',
+                        filter=Q(products__orderitem__order__user=user)
+                    )
+                ).filter(
+                    Q(purchase_count__gt=0) | Q(is_featured=True)
+                ).order_by('-purchase_count', '-is_featured')[:6])
+                cache.set(cache_key, categories, 1800)  # 30 minutes
             
-            return unique_categories
+            return categories
         except:
             from products.models import Category
             return Category.objects.filter(is_featured=True)[:6]
@@ -0,0 +1,16 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .db_utils import SQLITE_PRAGMAS
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Tune SQLite connections: WAL journal, memory-mapped I/O and a 32MB page cache.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {pragma}')
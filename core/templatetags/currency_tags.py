@@ -3,6 +3,15 @@ from decimal import Decimal
 
 register = template.Library()
 
+# Currency symbols and formats
+CURRENCY_FORMATS = {
+    'USD': ('$', 'before', 2),  # ($123.45)
+    'EUR': ('€', 'before', 2),  # (€123.45)
+    'KES': ('KSh', 'before', 0),  # (KSh 123)
+    'TZS': ('TSh', 'before', 0),  # (TSh 123)
+    'PI': ('π', 'before', 4),  # (π 123.4567)
+}
+
 @register.filter
 def currency_display(price, currency='USD'):
     """
@@ -11,25 +20,15 @@ def currency_display(price, currency='USD'):
     if not price:
         return '-'
     
-    # Currency symbols and formats
-    currency_formats = {
-        'USD': ('$', 'before', 2),  # ($123.45)
-        'EUR': ('€', 'before', 2),  # (€123.45)
-        'KES': ('KSh', 'before', 0),  # (KSh 123)
-        'TZS': ('TSh', 'before', 0),  # (TSh 123)
-        'PI': ('π', 'before', 4),  # (π 123.4567)
-    }
-    
-    if currency not in currency_formats:
+    if currency not in CURRENCY_FORMATS:
         currency = 'USD'  # fallback
     
-    symbol, position, decimals = currency_formats[currency]
+    symbol, position, decimals = CURRENCY_FORMATS[currency]
     
-    # Format the price
-    if decimals == 0:
-        formatted_price = f"{float(price):,.0f}"
-    else:
-        formatted_price = f"{float(price):,.{decimals}f}"
+    # Format the price directly from Decimal, no float round-trip
+    if not isinstance(price, Decimal):
+        price = Decimal(str(price))
+    formatted_price = f"{price:,.{decimals}f}"
     
     # Position the symbol
     if position == 'before':
@@ -1,7 +1,14 @@
 from django.conf import settings
-from django.views.decorators.http import require_POST
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.shortcuts import redirect, render
 from django.views.decorators.csrf import csrf_exempt
-from django.shortcuts import redirect
+from django.views.decorators.http import require_POST
+from products.models import Product
+from users.models import UserProfile
+from reviews.models import Review
+
 
 # Currency switcher view
 @require_POST
@@ -13,29 +20,59 @@ def set_currency(request):
     if currency in valid_currencies:
         request.session['currency'] = currency
     return redirect(next_url)
-from django.shortcuts import render
-from django.contrib.auth.models import User
-from django.db.models import Q
-from products.models import Product
-from users.models import UserProfile
-from reviews.models import Review
-from orders.models import Order
+
+
+# Static help-center FAQ, built once at import time
+FAQ_ITEMS = [
+    {
+        'question': 'How do I place an order?',
+        'answer': 'Browse our products, add items to your cart, and proceed to checkout. You can pay using various secure payment methods.'
+    },
+    {
+        'question': 'What payment methods do you accept?',
+        'answer': 'We accept major credit cards, PayPal, mobile money, and bank transfers.'
+    },
+    {
+        'question': 'How can I track my order?',
+        'answer': 'Go to your dashboard and click on "Order History" to view all your orders and their current status.'
+    },
+    {
+        'question': 'What is your return policy?',
+        'answer': 'We offer a 30-day return policy for most items. Items must be in original condition.'
+    },
+    {
+        'question': 'How do I use coupon codes?',
+        'answer': 'Enter your coupon code at checkout or apply it in your shopping cart before proceeding to payment.'
+    }
+]
+
+# Static context for deals template
+DEALS_CONTEXT = {
+    'total_deals': '150+',
+    'total_savings': '$50K+',
+    'happy_customers': '2.5K+',
+    'avg_discount': '45%',
+}
 
 
 def home(request):
-    products = Product.objects.filter(is_active=True)[:3]
+    # Only load the columns the product tiles render
+    products = Product.objects.filter(is_active=True).only(
+        'id', 'name', 'slug', 'description', 'price', 'compare_price', 'currency', 'image'
+    )[:3]
     return render(request, 'core/home.html', {'products': products})
 
 
 def deals_view(request):
-    # Add some context for deals template
-    context = {
-        'total_deals': '150+',
-        'total_savings': '$50K+',
-        'happy_customers': '2.5K+',
-        'avg_discount': '45%',
+    return render(request, 'core/deals.html', DEALS_CONTEXT)
+
+
+def _registry_slow_stats():
+    # Review and verification totals change slowly; cached by registry_view
+    return {
+        'total_reviews': Review.objects.count(),
+        'verified_buyers': UserProfile.objects.filter(is_verified=True).count(),
     }
-    return render(request, 'core/deals.html', context)
 
 
 def registry_view(request):
@@ -50,19 +87,21 @@ def registry_view(request):
             Q(user__last_name__icontains=search_query) |
             Q(bio__icontains=search_query)
         )
+    public_profiles = public_profiles[:20]  # Limit to 20 profiles (SQL LIMIT)
     
     # Get statistics for the page
-    total_users = User.objects.count()
-    active_users = User.objects.filter(last_login__isnull=False).count()
-    total_reviews = Review.objects.count() if hasattr(Review, 'objects') else 0
-    verified_buyers = UserProfile.objects.filter(is_verified=True).count()
+    user_stats = User.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(last_login__isnull=False)),
+    )
+    slow_stats = cache.get_or_set('registry:stats', _registry_slow_stats, 300)
     
     context = {
-        'public_profiles': public_profiles[:20],  # Limit to 20 profiles
-        'total_users': total_users,
-        'active_users': active_users,
-        'total_reviews': total_reviews,
-        'verified_buyers': verified_buyers,
+        'public_profiles': public_profiles,
+        'total_users': user_stats['total'],
+        'active_users': user_stats['active'],
+        'total_reviews': slow_stats['total_reviews'],
+        'verified_buyers': slow_stats['verified_buyers'],
     }
     return render(request, 'core/registry.html', context)
 
@@ -73,38 +112,14 @@ def customer_service_view(request):
 
 def help_view(request):
     """Help center page"""
-    faq_items = [
-        {
-            'question': 'How do I place an order?',
-            'answer': 'Browse our products, add items to your cart, and proceed to checkout. You can pay using various secure payment methods.'
-        },
-        {
-            'question': 'What payment methods do you accept?',
-            'answer': 'We accept major credit cards, PayPal, mobile money, and bank transfers.'
-        },
-        {
-            'question': 'How can I track my order?',
-            'answer': 'Go to your dashboard and click on "Order History" to view all your orders and their current status.'
-        },
-        {
-            'question': 'What is your return policy?',
-            'answer': 'We offer a 30-day return policy for most items. Items must be in original condition.'
-        },
-        {
-            'question': 'How do I use coupon codes?',
-            'answer': 'Enter your coupon code at checkout or apply it in your shopping cart before proceeding to payment.'
-        }
-    ]
-    
     context = {
-        'faq_items': faq_items,
+        'faq_items': FAQ_ITEMS,
     }
     return render(request, 'core/help.html', context)
 
 
 def debug_static_view(request):
     """Debug static files - useful for development"""
-    from django.conf import settings
     context = {
         'STATIC_URL': settings.STATIC_URL,
         'MEDIA_URL': settings.MEDIA_URL,
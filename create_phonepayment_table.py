@@ -1,24 +1,19 @@
 #!/usr/bin/env python
-import sqlite3
-import os
+from db_utils import get_conn
 
 def create_phonepayment_table():
-    db_path = 'db.sqlite3'
-    
-    conn = sqlite3.connect(db_path)
+    # Shared, already-tuned connection (see db_utils.py)
+    conn = get_conn()
     cursor = conn.cursor()
     
-    # Drop table if it exists (to avoid conflicts)
-    cursor.execute("DROP TABLE IF EXISTS payments_phonepayment;")
-    
-    # Create the PhonePayment table
+    # Create the PhonePayment table (idempotent, existing rows are kept)
     create_sql = '''
-    CREATE TABLE payments_phonepayment (
+    CREATE TABLE IF NOT EXISTS payments_phonepayment (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         payment_type VARCHAR(20) NOT NULL,
         provider VARCHAR(20) NOT NULL DEFAULT 'mpesa',
         phone_number VARCHAR(15) NOT NULL,
-        amount DECIMAL(10,2) NOT NULL,
+        amount INTEGER NOT NULL CHECK (amount >= 0),
         description VARCHAR(255) NOT NULL,
         reference VARCHAR(100) NOT NULL UNIQUE,
         status VARCHAR(20) NOT NULL DEFAULT 'pending',
@@ -36,8 +31,8 @@ def create_phonepayment_table():
     '''
     
     try:
-        cursor.execute(create_sql)
-        conn.commit()
+        with conn:
+            cursor.execute(create_sql)
         print("✓ payments_phonepayment table created successfully")
         
         # Verify the table was created
@@ -49,8 +44,6 @@ def create_phonepayment_table():
             
     except Exception as e:
         print(f"Error creating table: {e}")
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
     create_phonepayment_table()
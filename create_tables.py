@@ -6,10 +6,12 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dolesecommerce.settings')
 django.setup()
 
-from django.db import connection
+from django.db import connection, transaction
 
 def create_missing_tables():
-    with connection.cursor() as cursor:
+    # One transaction (and one commit sync) for all three tables; a failing
+    # statement rolls the whole batch back instead of leaving the write lock held
+    with transaction.atomic(), connection.cursor() as cursor:
         # Create PhonePayment table
         sql = '''
         CREATE TABLE IF NOT EXISTS "payments_phonepayment" (
@@ -17,7 +19,7 @@ def create_missing_tables():
             "payment_type" varchar(20) NOT NULL,
             "provider" varchar(20) NOT NULL,
             "phone_number" varchar(15) NOT NULL,
-            "amount" decimal NOT NULL,
+            "amount" integer NOT NULL CHECK ("amount" >= 0),
             "description" varchar(255) NOT NULL,
             "reference" varchar(100) NOT NULL UNIQUE,
             "status" varchar(20) NOT NULL,
@@ -28,10 +30,8 @@ def create_missing_tables():
             "initiated_by_id" integer NULL,
             "mpesa_b2c_id" integer NULL UNIQUE,
             "mpesa_c2b_id" integer NULL UNIQUE
-        )
+        );
         '''
-        cursor.execute(sql)
-        print("PhonePayment table created successfully")
 
         # Create MpesaB2CTransaction table  
         sql_b2c = '''
@@ -40,7 +40,7 @@ def create_missing_tables():
             "conversation_id" varchar(255) NOT NULL UNIQUE,
             "originator_conversation_id" varchar(255) NOT NULL,
             "phone_number" varchar(15) NOT NULL,
-            "amount" decimal NOT NULL,
+            "amount" integer NOT NULL CHECK ("amount" >= 0),
             "remarks" varchar(255) NOT NULL,
             "occasion" varchar(100) NOT NULL,
             "status" varchar(20) NOT NULL,
@@ -56,10 +56,8 @@ def create_missing_tables():
             "created_at" datetime NOT NULL,
             "updated_at" datetime NOT NULL,
             "payment_id" integer NULL
-        )
+        );
         '''
-        cursor.execute(sql_b2c)
-        print("MpesaB2CTransaction table created successfully")
 
         # Create MpesaC2BTransaction table
         sql_c2b = '''
@@ -68,7 +66,7 @@ def create_missing_tables():
             "checkout_request_id" varchar(255) NOT NULL UNIQUE,
             "merchant_request_id" varchar(255) NOT NULL,
             "phone_number" varchar(15) NOT NULL,
-            "amount" decimal NOT NULL,
+            "amount" integer NOT NULL CHECK ("amount" >= 0),
             "account_reference" varchar(255) NOT NULL,
             "transaction_desc" varchar(255) NOT NULL,
             "status" varchar(20) NOT NULL,
@@ -79,9 +77,13 @@ def create_missing_tables():
             "created_at" datetime NOT NULL,
             "updated_at" datetime NOT NULL,
             "payment_id" integer NOT NULL
-        )
+        );
         '''
-        cursor.execute(sql_c2b)
+
+        for statement in (sql, sql_b2c, sql_c2b):
+            cursor.execute(statement)
+        print("PhonePayment table created successfully")
+        print("MpesaB2CTransaction table created successfully")
         print("MpesaC2BTransaction table created successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Shared SQLite connection for the standalone helper scripts
+"""
+import atexit
+import sqlite3
+
+from core.db_utils import SQLITE_PRAGMAS
+
+DB_PATH = 'db.sqlite3'
+
+_connections = {}
+
+
+def get_conn(db_path=DB_PATH):
+    """
+    Return a cached connection for db_path, opening and tuning it on first use.
+
+    Callers should commit but not close it, so the page cache stays warm
+    when several helpers run in the same process; every cached connection
+    is closed when the script exits.
+    """
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path)
+        conn.executescript(''.join(f'PRAGMA {pragma};' for pragma in SQLITE_PRAGMAS))
+        _connections[db_path] = conn
+    return conn
+
+
+@atexit.register
+def close_all():
+    while _connections:
+        _connections.popitem()[1].close()
@@ -123,6 +123,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,  # Reuse connections across requests/script steps
+        'CONN_HEALTH_CHECKS': True,  # Drop a dead persistent connection before reuse
     }
 }
 
@@ -267,6 +269,7 @@ STOCK_RESERVATION_TIMEOUT = 15  # minutes
 # Performance Settings
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = False
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'  # Reads from cache, writes through to DB
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -1,23 +1,15 @@
 #!/usr/bin/env python
 import os
-import django
 
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dolesecommerce.settings')
-django.setup()
-
-from django.core.management.color import no_style
 from django.db import connection
-from payments.models import PhonePayment, MpesaB2CTransaction, MpesaC2BTransaction
 
 def create_payment_tables():
     """Create payment tables using Django's schema editor"""
+    from payments.models import PhonePayment, MpesaB2CTransaction, MpesaC2BTransaction
     
-    style = no_style()
-    sql = connection.ops.sql_table_creation_suffix()
-    
-    # Get the table creation SQL for each model
-    with connection.schema_editor() as schema_editor:
+    # Get the table creation SQL for each model; the schema editor runs all
+    # three CREATE TABLEs in a single transaction on SQLite (atomic by default)
+    with connection.schema_editor(atomic=True) as schema_editor:
         # Create PhonePayment table
         try:
             schema_editor.create_model(PhonePayment)
@@ -40,17 +32,21 @@ def create_payment_tables():
             print(f"MpesaC2BTransaction table creation error: {e}")
 
 def check_table_exists():
-    """Check if tables exist"""
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='payments_phonepayment';")
-        if cursor.fetchone():
-            print("✓ payments_phonepayment table exists")
-            return True
-        else:
-            print("✗ payments_phonepayment table does not exist")
-            return False
+    """Check if tables exist (one introspection query for all table names)"""
+    names = set(connection.introspection.table_names())
+    if 'payments_phonepayment' in names:
+        print("✓ payments_phonepayment table exists")
+        return True
+    else:
+        print("✗ payments_phonepayment table does not exist")
+        return False
 
 if __name__ == "__main__":
+    # Setup Django only when run as a script
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dolesecommerce.settings')
+    django.setup()
+
     print("Checking table existence...")
     if not check_table_exists():
         print("\nCreating missing tables...")
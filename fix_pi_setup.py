@@ -5,11 +5,6 @@ Quick fix script to ensure Pi payment tables exist and create initial rate
 
 import os
 import sys
-import django
-
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dolesecommerce.settings')
-django.setup()
 
 def fix_pi_payment_setup():
     print("🔧 Fixing Pi Payment Setup...")
@@ -29,21 +24,23 @@ def fix_pi_payment_setup():
             print(f"❌ PiCoinRate table issue: {e}")
             return False
         
+        # Fetch the active rate once and reuse it below
+        current_rate = PiCoinRate.objects.filter(is_active=True).only('pi_to_usd').first()
+        
         # Create default rate if none exists
-        if not PiCoinRate.objects.filter(is_active=True).exists():
-            rate = PiCoinRate.objects.create(
+        if current_rate is None:
+            current_rate = PiCoinRate.objects.create(
                 pi_to_usd=Decimal('0.314159'),
                 source='default_setup',
                 is_active=True
             )
-            print(f"✅ Created default Pi rate: 1π = ${rate.pi_to_usd} USD")
+            print(f"✅ Created default Pi rate: 1π = ${current_rate.pi_to_usd} USD")
         else:
-            current_rate = PiCoinRate.objects.filter(is_active=True).first()
             print(f"✅ Using existing rate: 1π = ${current_rate.pi_to_usd} USD")
         
-        # Test conversion
+        # Test conversion with the rate already in hand (no extra rate lookup)
         test_usd = Decimal('10.00')
-        test_pi = PiCoinRate.convert_usd_to_pi(test_usd)
+        test_pi = test_usd / current_rate.pi_to_usd
         print(f"✅ Test conversion: ${test_usd} = {test_pi:.7f}π")
         
         print("🎉 Pi Payment setup complete!")
@@ -56,5 +53,9 @@ def fix_pi_payment_setup():
         return False
 
 if __name__ == '__main__':
+    # Setup Django only when run as a script
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dolesecommerce.settings')
+    django.setup()
     success = fix_pi_payment_setup()
     sys.exit(0 if success else 1)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        ('products', '0011_productsimilarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pricealert',
+            index=models.Index(condition=models.Q(('is_active', True), ('notified', False)), fields=['product', 'target_price'], name='pricealert_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(condition=models.Q(('is_active', True), ('notified', False)), fields=['product'], name='stockalert_active_idx'),
+        ),
+    ]
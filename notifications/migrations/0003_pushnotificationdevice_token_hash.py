@@ -0,0 +1,37 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_token_hash(apps, schema_editor):
+    PushNotificationDevice = apps.get_model('notifications', 'PushNotificationDevice')
+    devices = list(PushNotificationDevice.objects.only('id', 'device_token'))
+    for device in devices:
+        device.token_hash = hashlib.blake2b(device.device_token.encode(), digest_size=16).digest()
+    PushNotificationDevice.objects.bulk_update(devices, ['token_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alert_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushnotificationdevice',
+            name='token_hash',
+            field=models.BinaryField(editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill_token_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pushnotificationdevice',
+            name='token_hash',
+            field=models.BinaryField(editable=False, max_length=16, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='pushnotificationdevice',
+            name='device_token',
+            field=models.TextField(),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_pushnotificationdevice_token_hash'),
+        ('orders', '0001_initial'),
+        ('products', '0011_productsimilarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='notif_unread_idx'),
+        ),
+    ]
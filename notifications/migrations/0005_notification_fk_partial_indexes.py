@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_unread_partial_index'),
+        ('orders', '0001_initial'),
+        ('products', '0011_productsimilarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='order',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='orders.order'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='product',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('product__isnull', False)), fields=['product'], name='notif_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('order__isnull', False)), fields=['order'], name='notif_order_idx'),
+        ),
+    ]
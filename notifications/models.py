@@ -1,9 +1,66 @@
+import hashlib
 from django.db import models
 from django.contrib.auth.models import User
 from products.models import Product
 from orders.models import Order
 
 
+class NotificationManager(models.Manager):
+    """Join the relations used by __str__ and listings up front"""
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'product', 'order')
+
+
+class UserProductAlertManager(models.Manager):
+    """Join user and product for StockAlert/PriceAlert listings"""
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'product')
+
+
+class EmailTemplateManager(models.Manager):
+    def listing(self):
+        """Templates without the large html/text bodies, for lists and pickers"""
+        return self.defer('html_content', 'text_content')
+
+
+class PushNotificationDeviceQuerySet(models.QuerySet):
+    """
+    Keep token_hash in step with device_token on the write paths that
+    bypass save()
+    """
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.token_hash = PushNotificationDevice.hash_token(obj.device_token)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'device_token' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.token_hash = PushNotificationDevice.hash_token(obj.device_token)
+            fields = [*fields, 'token_hash']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        # bulk_update passes both columns as CASE expressions
+        if 'device_token' in kwargs and 'token_hash' not in kwargs:
+            token = kwargs['device_token']
+            if not isinstance(token, str):
+                raise TypeError('device_token can only be updated to a literal token')
+            kwargs['token_hash'] = PushNotificationDevice.hash_token(token)
+        return super().update(**kwargs)
+
+
+class PushNotificationDeviceManager(models.Manager.from_queryset(PushNotificationDeviceQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().select_related('user')
+
+    def get_by_token(self, token):
+        """Look a device up through the short token hash rather than the raw token"""
+        return self.get(token_hash=PushNotificationDevice.hash_token(token))
+
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('order_placed', 'Order Placed'),
@@ -23,16 +80,28 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
     title = models.CharField(max_length=255)
     message = models.TextField()
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True)
+    # Mostly NULL, so indexed with partial indexes in Meta instead of full FK indexes
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
     is_read = models.BooleanField(default=False)
     is_email_sent = models.BooleanField(default=False)
     is_push_sent = models.BooleanField(default=False)
     action_url = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationManager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread notifications per user, newest first
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_unread_idx'),
+            models.Index(fields=['notification_type', '-created_at'], name='notif_type_created_idx'),
+            # Unread badge count
+            models.Index(fields=['user'], name='notif_unread_idx', condition=models.Q(is_read=False)),
+            models.Index(fields=['product'], name='notif_product_idx', condition=models.Q(product__isnull=False)),
+            models.Index(fields=['order'], name='notif_order_idx', condition=models.Q(order__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -58,20 +127,38 @@ class EmailTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EmailTemplateManager()
+
     def __str__(self):
         return self.name
 
 
 class PushNotificationDevice(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_devices')
-    device_token = models.CharField(max_length=255, unique=True)
+    device_token = models.TextField()
+    # 16-byte blake2b digest of device_token; keeps the unique index small
+    token_hash = models.BinaryField(max_length=16, unique=True, editable=False)
     device_type = models.CharField(max_length=20, choices=[('ios', 'iOS'), ('android', 'Android'), ('web', 'Web')])
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PushNotificationDeviceManager()
+
     def __str__(self):
         return f"{self.user.username} - {self.device_type}"
 
+    @staticmethod
+    def hash_token(token):
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def save(self, *args, **kwargs):
+        self.token_hash = self.hash_token(self.device_token)
+        # update_or_create() saves only the fields it changed
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'device_token' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_hash'}
+        super().save(*args, **kwargs)
+
 
 class StockAlert(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_alerts')
@@ -80,8 +167,15 @@ class StockAlert(models.Model):
     notified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UserProductAlertManager()
+
     class Meta:
         unique_together = ['user', 'product']
+        indexes = [
+            # Only the pending working set is indexed
+            models.Index(fields=['product'], name='stockalert_active_idx',
+                         condition=models.Q(is_active=True, notified=False)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
@@ -95,8 +189,15 @@ class PriceAlert(models.Model):
     notified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UserProductAlertManager()
+
     class Meta:
         unique_together = ['user', 'product']
+        indexes = [
+            # Only the pending working set is indexed
+            models.Index(fields=['product', 'target_price'], name='pricealert_price_idx',
+                         condition=models.Q(is_active=True, notified=False)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} (${self.target_price})"
@@ -1,20 +1,82 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.urls import reverse
-from django.db.models import Sum, Count
+from django.template import Context, Template
+from django.utils import timezone
+from django.db.models import Sum, Count, F, Q, Value, BooleanField, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from core.admin_utils import admin_change_url, is_changelist
 from .models import Order, OrderItem
 
+# Row templates for list columns, filled with format_html so every value is
+# escaped; numbers are formatted before they are passed in
+_ORDER_NUMBER_TMPL = '<span class="badge bg-primary" style="font-size: 12px;">#{}</span>'
+_CUSTOMER_TMPL = '<a href="{}" class="text-decoration-none">{}</a><br><small class="text-muted">{}</small>'
+_ITEMS_COUNT_TMPL = '<span class="badge bg-secondary">{} items</span><br><small>{} total qty</small>'
+_ORDER_TOTAL_TMPL = '<span class="badge bg-{} fs-6">TZS {}</span>'
+_ORDER_LINK_TMPL = '<a href="{}" class="text-decoration-none">Order #{}</a>'
+_PRODUCT_INFO_TMPL = '<a href="{}" class="text-decoration-none">{}</a><br><small class="text-muted">SKU: {}</small>'
+_INLINE_ITEM_TOTAL_TMPL = '<strong>TZS {}</strong>'
+_ITEM_TOTAL_TMPL = '<strong class="text-success">TZS {}</strong>'
+
+# Columns the list pages actually render; the change form still loads everything
+_ORDER_LIST_FIELDS = (
+    'id', 'is_paid', 'created_at', 'updated_at',
+    'user__id', 'user__username', 'user__email', 'user__first_name',
+    'user__last_name', 'user__date_joined',
+)
+_ORDER_ITEM_LIST_FIELDS = (
+    'id', 'quantity', 'price',
+    'order__id', 'order__is_paid', 'order__created_at',
+    'order__user__id', 'order__user__username', 'order__user__first_name', 'order__user__last_name',
+    'product__id', 'product__name', 'product__sku',
+    'product__brand__name', 'product__category__name',
+)
+
+# Compiled once at import; rendering autoescapes the user's details
+_CUSTOMER_CARD = Template('''
+        <div class="card" style="max-width: 400px;">
+            <div class="card-header bg-info text-white">
+                <h6 class="mb-0">👤 Customer Information</h6>
+            </div>
+            <div class="card-body">
+                <p><strong>Name:</strong> {{ user.get_full_name|default:user.username }}</p>
+                <p><strong>Email:</strong> {{ user.email }}</p>
+                <p><strong>Username:</strong> {{ user.username }}</p>
+                <p><strong>Member Since:</strong> {{ user.date_joined|date:"F Y" }}</p>
+                <a href="{{ profile_link }}" class="btn btn-outline-primary btn-sm">View Full Profile</a>
+            </div>
+        </div>
+        ''')
+
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _line_total_sum(prefix=''):
+    """SUM(quantity * price) over order items, 0 when there are none"""
+    return Coalesce(
+        Sum(ExpressionWrapper(F(f'{prefix}quantity') * F(f'{prefix}price'), output_field=_MONEY)),
+        Value(Decimal('0')),
+        output_field=_MONEY
+    )
+
+
+def _order_total(order):
+    return order.items.aggregate(t=_line_total_sum())['t']
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    raw_id_fields = ('product',)
     readonly_fields = ('get_item_total',)
     fields = ('product', 'quantity', 'price', 'get_item_total')
     
     def get_item_total(self, obj):
         if obj.pk:
-            total = obj.quantity * obj.price
-            return format_html('<strong>TZS {:,.2f}</strong>', total)
+            return format_html(_INLINE_ITEM_TOTAL_TMPL, f'{obj.quantity * obj.price:,.2f}')
         return '-'
     get_item_total.short_description = 'Total'
 
@@ -22,10 +84,12 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('get_order_number', 'get_customer', 'get_order_status', 'get_items_count', 'get_order_total', 'created_at')
     list_filter = ('is_paid', 'created_at', 'updated_at')
-    search_fields = ('user__username', 'user__email', 'shipping_address', 'id')
+    search_fields = ('user__username', 'user__email', '=id')
     readonly_fields = ('created_at', 'updated_at', 'get_order_summary', 'get_customer_info')
     ordering = ('-created_at',)
     inlines = [OrderItemInline]
+    list_select_related = ('user',)
+    show_full_result_count = False
     
     fieldsets = (
         ('Order Information', {
@@ -40,20 +104,31 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Item count, quantity, total and the "new" flag come back with each
+        # row instead of extra queries and clock reads per order
+        cutoff = timezone.now() - timedelta(hours=24)
+        qs = super().get_queryset(request).select_related('user')
+        if is_changelist(request):
+            qs = qs.only(*_ORDER_LIST_FIELDS)
+        return qs.annotate(
+            _is_new=ExpressionWrapper(Q(created_at__gt=cutoff), output_field=BooleanField()),
+            _items_count=Count('items', distinct=True),
+            _items_qty=Coalesce(Sum('items__quantity'), 0),
+            _order_total=_line_total_sum('items__'),
+        )
+    
     def get_order_number(self, obj):
         """Display formatted order number"""
-        return format_html(
-            '<span class="badge bg-primary" style="font-size: 12px;">#{:05d}</span>',
-            obj.id
-        )
+        return format_html(_ORDER_NUMBER_TMPL, f'{obj.id:05d}')
     get_order_number.short_description = 'Order #'
     
     def get_customer(self, obj):
         """Display customer with link"""
         full_name = obj.user.get_full_name() or obj.user.username
         return format_html(
-            '<a href="{}" class="text-decoration-none">{}</a><br><small class="text-muted">{}</small>',
-            reverse('admin:auth_user_change', args=[obj.user.pk]),
+            _CUSTOMER_TMPL,
+            admin_change_url('admin:auth_user_change', obj.user.pk),
             full_name,
             obj.user.email
         )
@@ -68,10 +143,8 @@ class OrderAdmin(admin.ModelAdmin):
         else:
             status_badges.append('<span class="badge bg-warning">⏳ Pending Payment</span>')
             
-        # Check if order is recent (within 24 hours)
-        from django.utils import timezone
-        from datetime import timedelta
-        if obj.created_at > timezone.now() - timedelta(hours=24):
+        # Recent (within 24 hours), flagged by get_queryset
+        if obj._is_new:
             status_badges.append('<span class="badge bg-info">🆕 New</span>')
             
         return mark_safe(' '.join(status_badges))
@@ -79,18 +152,12 @@ class OrderAdmin(admin.ModelAdmin):
     
     def get_items_count(self, obj):
         """Display number of items in order"""
-        count = obj.items.count()
-        total_quantity = obj.items.aggregate(total=Sum('quantity'))['total'] or 0
-        
-        return format_html(
-            '<span class="badge bg-secondary">{} items</span><br><small>{} total qty</small>',
-            count, total_quantity
-        )
+        return format_html(_ITEMS_COUNT_TMPL, obj._items_count, obj._items_qty)
     get_items_count.short_description = 'Items'
     
     def get_order_total(self, obj):
         """Calculate and display order total"""
-        total = sum(item.quantity * item.price for item in obj.items.all())
+        total = obj._order_total if hasattr(obj, '_order_total') else _order_total(obj)
         
         if total > 0:
             # Color code based on order value
@@ -101,18 +168,19 @@ class OrderAdmin(admin.ModelAdmin):
             else:
                 color = 'secondary'
                 
-            return format_html(
-                '<span class="badge bg-{} fs-6">TZS {:,.2f}</span>',
-                color, total
-            )
-        return format_html('<span class="text-muted">TZS 0.00</span>')
+            return format_html(_ORDER_TOTAL_TMPL, color, f'{total:,.2f}')
+        return mark_safe('<span class="text-muted">TZS 0.00</span>')
     get_order_total.short_description = 'Total Amount'
     
     def get_order_summary(self, obj):
         """Display comprehensive order summary"""
         if obj.pk:
-            items_count = obj.items.count()
-            total_amount = sum(item.quantity * item.price for item in obj.items.all())
+            # Rendered once per object; the change form can ask more than once
+            if hasattr(obj, '_summary_html'):
+                return obj._summary_html
+            agg = obj.items.aggregate(cnt=Count('id'), total=_line_total_sum())
+            items_count = agg['cnt']
+            total_amount = agg['total']
             
             summary = f"""
             <div class="card" style="max-width: 400px;">
@@ -127,40 +195,39 @@ class OrderAdmin(admin.ModelAdmin):
                 </div>
             </div>
             """
-            return mark_safe(summary)
+            obj._summary_html = mark_safe(summary)
+            return obj._summary_html
         return '-'
     get_order_summary.short_description = 'Order Summary'
     
     def get_customer_info(self, obj):
         """Display customer information card"""
-        profile_link = reverse('admin:auth_user_change', args=[obj.user.pk])
-        
-        info = f"""
-        <div class="card" style="max-width: 400px;">
-            <div class="card-header bg-info text-white">
-                <h6 class="mb-0">👤 Customer Information</h6>
-            </div>
-            <div class="card-body">
-                <p><strong>Name:</strong> {obj.user.get_full_name() or obj.user.username}</p>
-                <p><strong>Email:</strong> {obj.user.email}</p>
-                <p><strong>Username:</strong> {obj.user.username}</p>
-                <p><strong>Member Since:</strong> {obj.user.date_joined.strftime('%B %Y')}</p>
-                <a href="{profile_link}" class="btn btn-outline-primary btn-sm">View Full Profile</a>
-            </div>
-        </div>
-        """
-        return mark_safe(info)
+        if hasattr(obj, '_customer_info_html'):
+            return obj._customer_info_html
+        profile_link = admin_change_url('admin:auth_user_change', obj.user.pk)
+        obj._customer_info_html = _CUSTOMER_CARD.render(
+            Context({'user': obj.user, 'profile_link': profile_link})
+        )
+        return obj._customer_info_html
     get_customer_info.short_description = 'Customer Details'
     
     actions = ['mark_as_paid', 'mark_as_unpaid']
     
+    def _set_paid(self, queryset, is_paid):
+        # Resolve the selected ids in SQL: one unordered UPDATE whose statement
+        # doesn't grow with the selection, and none of the changelist's item
+        # aggregates are computed in the subquery
+        return Order.objects.filter(pk__in=queryset.order_by().values('pk')).update(
+            is_paid=is_paid, updated_at=timezone.now()
+        )
+    
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(is_paid=True)
+        updated = self._set_paid(queryset, True)
         self.message_user(request, f'{updated} orders were marked as paid.')
     mark_as_paid.short_description = "💳 Mark selected orders as paid"
     
     def mark_as_unpaid(self, request, queryset):
-        updated = queryset.update(is_paid=False)
+        updated = self._set_paid(queryset, False)
         self.message_user(request, f'{updated} orders were marked as unpaid.')
     mark_as_unpaid.short_description = "⏳ Mark selected orders as unpaid"
 
@@ -168,9 +235,17 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('get_order_link', 'get_product_info', 'quantity', 'price', 'get_item_total')
     list_filter = ('order__is_paid', 'order__created_at')
-    search_fields = ('order__id', 'product__name', 'product__sku')
+    search_fields = ('=order__id', 'product__name', '=product__sku')
     readonly_fields = ('get_item_total', 'get_order_info', 'get_product_details')
     ordering = ('-order__created_at',)
+    list_select_related = ('order', 'order__user', 'product', 'product__brand', 'product__category')
+    raw_id_fields = ('order', 'product')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if is_changelist(request):
+            qs = qs.only(*_ORDER_ITEM_LIST_FIELDS)
+        return qs
     
     fieldsets = (
         ('Order Information', {
@@ -187,17 +262,17 @@ class OrderItemAdmin(admin.ModelAdmin):
     def get_order_link(self, obj):
         """Display order link"""
         return format_html(
-            '<a href="{}" class="text-decoration-none">Order #{:05d}</a>',
-            reverse('admin:orders_order_change', args=[obj.order.pk]),
-            obj.order.id
+            _ORDER_LINK_TMPL,
+            admin_change_url('admin:orders_order_change', obj.order.pk),
+            f'{obj.order.id:05d}'
         )
     get_order_link.short_description = 'Order'
     
     def get_product_info(self, obj):
         """Display product information"""
         return format_html(
-            '<a href="{}" class="text-decoration-none">{}</a><br><small class="text-muted">SKU: {}</small>',
-            reverse('admin:products_product_change', args=[obj.product.pk]),
+            _PRODUCT_INFO_TMPL,
+            admin_change_url('admin:products_product_change', obj.product.pk),
             obj.product.name,
             obj.product.sku or 'N/A'
         )
@@ -206,8 +281,7 @@ class OrderItemAdmin(admin.ModelAdmin):
     def get_item_total(self, obj):
         """Calculate item total"""
         if obj.pk:
-            total = obj.quantity * obj.price
-            return format_html('<strong class="text-success">TZS {:,.2f}</strong>', total)
+            return format_html(_ITEM_TOTAL_TMPL, f'{obj.quantity * obj.price:,.2f}')
         return '-'
     get_item_total.short_description = 'Total'
     
@@ -218,18 +292,18 @@ class OrderItemAdmin(admin.ModelAdmin):
             return format_html(
                 '''
                 <div class="alert alert-info">
-                    <h6>📋 Order #{:05d}</h6>
+                    <h6>📋 Order #{}</h6>
                     <p><strong>Customer:</strong> {}</p>
                     <p><strong>Status:</strong> {}</p>
                     <p><strong>Date:</strong> {}</p>
                     <a href="{}" class="btn btn-primary btn-sm">View Full Order</a>
                 </div>
                 ''',
-                order.id,
+                f'{order.id:05d}',
                 order.user.get_full_name() or order.user.username,
                 'Paid' if order.is_paid else 'Pending Payment',
                 order.created_at.strftime('%B %d, %Y'),
-                reverse('admin:orders_order_change', args=[order.pk])
+                admin_change_url('admin:orders_order_change', order.pk)
             )
         return '-'
     get_order_info.short_description = 'Order Details'
@@ -254,7 +328,7 @@ class OrderItemAdmin(admin.ModelAdmin):
                 product.brand.name if product.brand else 'N/A',
                 product.category.name if product.category else 'N/A',
                 f'{product.stock_quantity} units' if hasattr(product, 'stock_quantity') else 'N/A',
-                reverse('admin:products_product_change', args=[product.pk])
+                admin_change_url('admin:products_product_change', product.pk)
             )
         return '-'
     get_product_details.short_description = 'Product Information'
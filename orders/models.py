@@ -9,6 +9,13 @@ class Order(models.Model):
     is_paid = models.BooleanField(default=False)
     shipping_address = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['is_paid', '-created_at']),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
 
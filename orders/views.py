@@ -1,7 +1,11 @@
 
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import Http404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.core.paginator import Paginator
 from .models import Order, OrderItem
 from products.models import Product
 from django.contrib import messages
@@ -18,8 +22,21 @@ def buy_now(request, product_id):
 
 @login_required
 def order_list(request):
-    orders = Order.objects.filter(user=request.user)
-    return render(request, 'orders/order_list.html', {'orders': orders})
+    orders = Order.objects.filter(user=request.user).annotate(
+        total=Sum(ExpressionWrapper(
+            F('items__quantity') * F('items__price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ))
+    ).order_by('-created_at')
+    paginator = Paginator(orders, 20)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    context = {
+        'page_obj': page_obj,
+        'orders': page_obj.object_list,
+    }
+    return render(request, 'orders/order_list.html', context)
 
 @login_required
 def order_detail(request, pk):
@@ -27,29 +44,40 @@ def order_detail(request, pk):
     return render(request, 'orders/order_detail.html', {'order': order})
 
 # --- Cart Functionality ---
+def _cart_products(cart, for_update=False):
+    """Fetch every product in the session cart with a single query"""
+    ids = [int(pk) for pk in cart.keys()]
+    queryset = Product.objects.select_for_update() if for_update else Product.objects
+    products = queryset.in_bulk(ids)
+    if len(products) != len(ids):
+        raise Http404('Product not found')
+    return products
+
 def cart_detail(request):
     cart = request.session.get('cart', {})
+    products = _cart_products(cart)
     cart_items = []
     total = 0
     for product_id, quantity in cart.items():
-        product = get_object_or_404(Product, pk=product_id)
+        product = products[int(product_id)]
         subtotal = product.price * quantity
         cart_items.append({'product': product, 'quantity': quantity, 'subtotal': subtotal})
         total += subtotal
     return render(request, 'orders/cart_detail.html', {'cart_items': cart_items, 'total': total})
 
 def cart_add(request, product_id):
-    cart = request.session.get('cart', {})
-    cart[str(product_id)] = cart.get(str(product_id), 0) + 1
-    request.session['cart'] = cart
+    # Every add changes a quantity, so this always needs one session save
+    cart = request.session.setdefault('cart', {})
+    key = str(product_id)
+    cart[key] = cart.get(key, 0) + 1
+    request.session.modified = True
     messages.success(request, 'Product added to cart.')
     return redirect('orders:cart_detail')
 
 def cart_remove(request, product_id):
     cart = request.session.get('cart', {})
-    if str(product_id) in cart:
-        del cart[str(product_id)]
-        request.session['cart'] = cart
+    if cart.pop(str(product_id), None) is not None:
+        request.session.modified = True
         messages.success(request, 'Product removed from cart.')
     return redirect('orders:cart_detail')
 
@@ -61,10 +89,16 @@ def cart_checkout(request):
         return redirect('orders:cart_detail')
     if request.method == 'POST':
         shipping_address = request.POST.get('shipping_address', '')
-        order = Order.objects.create(user=request.user, shipping_address=shipping_address)
-        for product_id, quantity in cart.items():
-            product = get_object_or_404(Product, pk=product_id)
-            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        # Order and items commit together, or not at all; the product rows
+        # stay locked so prices can't change mid-checkout
+        with transaction.atomic():
+            products = _cart_products(cart, for_update=True)
+            order = Order.objects.create(user=request.user, shipping_address=shipping_address)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=products[int(product_id)], quantity=quantity,
+                          price=products[int(product_id)].price)
+                for product_id, quantity in cart.items()
+            ], batch_size=500)
         request.session['cart'] = {}
         messages.success(request, 'Order placed successfully!')
         return redirect('orders:order_detail', pk=order.pk)
@@ -1,18 +1,34 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Substr
 from django.utils.html import format_html
-from django.urls import reverse
-from django.utils.safestring import mark_safe
+from core.admin_utils import admin_change_url, is_changelist
+from core.paginators import LargeTablePaginator
 from .models import (
     Payment, PiCoinRate, PiPaymentTransaction, 
     MpesaB2CTransaction, MpesaC2BTransaction, PhonePayment
 )
 
+# Link templates for list columns, filled with format_html
+_ORDER_LINK_TMPL = '<a href="{}">Order #{}</a>'
+_PAYMENT_LINK_TMPL = '<a href="{}">Payment #{}</a>'
+_CONFIRM_PI_TMPL = '<a href="{}" class="button">Confirm Pi Payment</a>'
+
+# Columns the payment changelist actually renders ('order' loads just order_id)
+_PAYMENT_LIST_FIELDS = (
+    'id', 'order', 'amount', 'payment_method', 'status', 'pi_amount', 'created_at',
+)
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
+    paginator = LargeTablePaginator
+    show_full_result_count = False
     list_display = [
         'id', 'order_link', 'amount', 'payment_method', 'status', 
         'pi_amount_display', 'created_at', 'payment_actions'
     ]
+    raw_id_fields = ('order', 'processed_by')
     list_filter = ['payment_method', 'status', 'pi_status', 'created_at']
     search_fields = [
         'order__id', 'payment_id', 'pi_payment_id', 
@@ -43,8 +59,8 @@ class PaymentAdmin(admin.ModelAdmin):
     )
     
     def order_link(self, obj):
-        url = reverse('admin:orders_order_change', args=[obj.order.id])
-        return format_html('<a href="{}">{}</a>', url, f'Order #{obj.order.id}')
+        url = admin_change_url('admin:orders_order_change', obj.order_id)
+        return format_html(_ORDER_LINK_TMPL, url, obj.order_id)
     order_link.short_description = 'Order'
     
     def pi_amount_display(self, obj):
@@ -54,26 +70,36 @@ class PaymentAdmin(admin.ModelAdmin):
     pi_amount_display.short_description = 'Pi Amount'
     
     def gateway_response_display(self, obj):
-        if obj.gateway_response:
+        # The preview comes from get_queryset; the full column is deferred. It
+        # carries one extra character so truncation can be detected without
+        # measuring the whole response.
+        preview = getattr(obj, '_gateway_response_preview', None)
+        if preview:
             return format_html(
                 '<pre style="background: #f8f9fa; padding: 10px; border-radius: 5px;">{}</pre>',
-                obj.gateway_response[:500] + ('...' if len(obj.gateway_response) > 500 else '')
+                preview[:500] + ('...' if len(preview) > 500 else '')
             )
         return "No response data"
     gateway_response_display.short_description = 'Gateway Response'
     
     def payment_actions(self, obj):
-        actions = []
-        
         if obj.is_pi_payment and obj.status == 'pending':
-            confirm_url = reverse('payments:confirm_pi_payment', args=[obj.id])
-            actions.append(f'<a href="{confirm_url}" class="button">Confirm Pi Payment</a>')
-        
-        return mark_safe(' '.join(actions))
+            confirm_url = admin_change_url('payments:confirm_pi_payment', obj.id)
+            return format_html(_CONFIRM_PI_TMPL, confirm_url)
+        return "-"
     payment_actions.short_description = 'Actions'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('order', 'processed_by')
+        # gateway_response can be large and is never edited here; only the
+        # change form needs its first 500 characters (plus one, see
+        # gateway_response_display)
+        qs = super().get_queryset(request)
+        if is_changelist(request):
+            # Skip the free-text and Pi detail columns no list column reads
+            return qs.only(*_PAYMENT_LIST_FIELDS)
+        return qs.defer('gateway_response').annotate(
+            _gateway_response_preview=Substr('gateway_response', 1, 501),
+        )
 
 
 @admin.register(PiCoinRate)
@@ -102,23 +128,37 @@ class PiCoinRateAdmin(admin.ModelAdmin):
     pi_to_usd_display.short_description = 'Pi to USD Rate'
     pi_to_usd_display.admin_order_field = 'pi_to_usd'
     
-    def change_from_previous(self, obj):
-        # Get the previous rate
+    def get_queryset(self, request):
+        # Each row carries the rate that preceded it, looked up in the same
+        # query; a correlated subquery (rather than LAG) keeps "previous"
+        # meaning the previous rate overall even when the list is filtered
         previous = PiCoinRate.objects.filter(
-            created_at__lt=obj.created_at
-        ).order_by('-created_at').first()
+            created_at__lt=OuterRef('created_at')
+        ).order_by('-created_at').values('pi_to_usd')[:1]
+        usage = Payment.objects.filter(
+            pi_exchange_rate=OuterRef('pi_to_usd')
+        ).order_by().values('pi_exchange_rate').annotate(c=Count('*')).values('c')
+        return super().get_queryset(request).annotate(
+            _prev_rate=Subquery(previous),
+            _usage_count=Coalesce(Subquery(usage, output_field=IntegerField()), 0),
+        )
+    
+    def change_from_previous(self, obj):
+        if obj.pk is None:
+            return "-"
+        previous_rate = obj._prev_rate
         
-        if previous:
-            change = obj.pi_to_usd - previous.pi_to_usd
+        if previous_rate is not None:
+            change = obj.pi_to_usd - previous_rate
             if change > 0:
                 return format_html(
-                    '<span style="color: green;">+${:.6f}</span>', 
-                    change
+                    '<span style="color: green;">+${}</span>', 
+                    f'{change:.6f}'
                 )
             elif change < 0:
                 return format_html(
-                    '<span style="color: red;">${:.6f}</span>', 
-                    change
+                    '<span style="color: red;">${}</span>', 
+                    f'{change:.6f}'
                 )
             else:
                 return "No change"
@@ -126,16 +166,23 @@ class PiCoinRateAdmin(admin.ModelAdmin):
     change_from_previous.short_description = 'Change'
     
     def usage_count(self, obj):
-        # Count payments using this rate
-        count = Payment.objects.filter(pi_exchange_rate=obj.pi_to_usd).count()
-        return f"{count} payments"
+        # Count of payments using this rate, annotated by get_queryset
+        return f"{getattr(obj, '_usage_count', 0)} payments"
     usage_count.short_description = 'Usage'
     
     def save_model(self, request, obj, form, change):
-        if obj.is_active:
-            # Deactivate other rates when setting this one as active
-            PiCoinRate.objects.filter(is_active=True).update(is_active=False)
-        super().save_model(request, obj, form, change)
+        with transaction.atomic():
+            if obj.is_active:
+                # Lock the other active rates so concurrent activations queue
+                # up, then deactivate them; the row being saved isn't rewritten
+                others = list(
+                    PiCoinRate.objects.select_for_update()
+                    .filter(is_active=True).exclude(pk=obj.pk)
+                    .values_list('pk', flat=True)
+                )
+                if others:
+                    PiCoinRate.objects.filter(pk__in=others).update(is_active=False)
+            super().save_model(request, obj, form, change)
 
 
 @admin.register(PiPaymentTransaction)
@@ -149,6 +196,7 @@ class PiPaymentTransactionAdmin(admin.ModelAdmin):
         'pi_payment_id', 'transaction_id', 'from_address', 
         'to_address', 'payment__order__id'
     ]
+    raw_id_fields = ('payment',)
     readonly_fields = ['created_at']
     ordering = ['-created_at']
     
@@ -170,17 +218,14 @@ class PiPaymentTransactionAdmin(admin.ModelAdmin):
     )
     
     def payment_link(self, obj):
-        url = reverse('admin:payments_payment_change', args=[obj.payment.id])
-        return format_html('<a href="{}">{}</a>', url, f'Payment #{obj.payment.id}')
+        url = admin_change_url('admin:payments_payment_change', obj.payment_id)
+        return format_html(_PAYMENT_LINK_TMPL, url, obj.payment_id)
     payment_link.short_description = 'Payment'
     
     def amount_pi_display(self, obj):
         return f"{obj.amount_pi:.7f} π"
     amount_pi_display.short_description = 'Pi Amount'
     amount_pi_display.admin_order_field = 'amount_pi'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('payment')
 
 
 # Custom admin site configuration
@@ -191,6 +236,8 @@ admin.site.index_title = "Payment Management Dashboard"
 
 @admin.register(MpesaB2CTransaction)
 class MpesaB2CTransactionAdmin(admin.ModelAdmin):
+    paginator = LargeTablePaginator
+    show_full_result_count = False
     list_display = [
         'conversation_id', 'formatted_phone_display', 'amount', 'status', 
         'response_code', 'created_at', 'transaction_receipt'
@@ -200,6 +247,7 @@ class MpesaB2CTransactionAdmin(admin.ModelAdmin):
         'conversation_id', 'phone_number', 'transaction_id', 
         'transaction_receipt', 'receiver_party_public_name'
     ]
+    raw_id_fields = ('payment',)
     readonly_fields = [
         'conversation_id', 'originator_conversation_id', 'response_code',
         'response_description', 'transaction_id', 'transaction_receipt',
@@ -240,13 +288,12 @@ class MpesaB2CTransactionAdmin(admin.ModelAdmin):
     def formatted_phone_display(self, obj):
         return obj.formatted_phone
     formatted_phone_display.short_description = 'Phone Number'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('payment')
 
 
 @admin.register(MpesaC2BTransaction)
 class MpesaC2BTransactionAdmin(admin.ModelAdmin):
+    paginator = LargeTablePaginator
+    show_full_result_count = False
     list_display = [
         'checkout_request_id', 'formatted_phone_display', 'amount', 'status',
         'result_code', 'created_at', 'mpesa_receipt_number'
@@ -256,6 +303,7 @@ class MpesaC2BTransactionAdmin(admin.ModelAdmin):
         'checkout_request_id', 'merchant_request_id', 'phone_number',
         'account_reference', 'mpesa_receipt_number'
     ]
+    raw_id_fields = ('payment',)
     readonly_fields = [
         'checkout_request_id', 'merchant_request_id', 'result_code',
         'result_desc', 'mpesa_receipt_number', 'transaction_date',
@@ -285,17 +333,18 @@ class MpesaC2BTransactionAdmin(admin.ModelAdmin):
     def formatted_phone_display(self, obj):
         return obj.formatted_phone
     formatted_phone_display.short_description = 'Phone Number'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('payment')
 
 
 @admin.register(PhonePayment)
 class PhonePaymentAdmin(admin.ModelAdmin):
+    paginator = LargeTablePaginator
+    show_full_result_count = False
     list_display = [
         'reference', 'payment_type', 'provider', 'formatted_phone_display', 
         'amount', 'status', 'initiated_by', 'created_at'
     ]
+    list_select_related = ('initiated_by',)
+    raw_id_fields = ('initiated_by', 'mpesa_b2c', 'mpesa_c2b')
     list_filter = ['payment_type', 'provider', 'status', 'created_at']
     search_fields = [
         'reference', 'phone_number', 'description', 'transaction_id',
@@ -332,8 +381,3 @@ class PhonePaymentAdmin(admin.ModelAdmin):
     def formatted_phone_display(self, obj):
         return obj.formatted_phone
     formatted_phone_display.short_description = 'Phone Number'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'initiated_by', 'mpesa_b2c', 'mpesa_c2b'
-        )
@@ -1,6 +1,13 @@
-from django.core.management.base import BaseCommand
+import csv
+from datetime import datetime, time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from decimal import Decimal, InvalidOperation
+from core.db_utils import DEFAULT_BATCH_SIZE
 from payments.models import PiCoinRate
 
 class Command(BaseCommand):
@@ -19,23 +26,94 @@ class Command(BaseCommand):
             default='manual',
             help='Rate source (default: manual)'
         )
+        parser.add_argument(
+            '--csv',
+            type=str,
+            help='Import historical rates from a CSV with pi_to_usd and '
+                 'optional source, created_at columns (imported rates are inactive)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per INSERT when importing --csv (default: {DEFAULT_BATCH_SIZE})'
+        )
 
     def handle(self, *args, **options):
+        if options['csv']:
+            return self.import_csv(options['csv'], options['source'], options['batch_size'])
+
         rate = Decimal(str(options['rate']))
         source = options['source']
         
-        # Deactivate existing rates
-        PiCoinRate.objects.filter(is_active=True).update(is_active=False)
-        
-        # Create new rate
-        pi_rate = PiCoinRate.objects.create(
-            pi_to_usd=rate,
-            source=source,
-            is_active=True
-        )
+        # Deactivate the other rates and create the new one in a single commit.
+        # An identical active rate is kept rather than duplicated, so re-running
+        # is a no-op
+        with transaction.atomic():
+            PiCoinRate.objects.filter(is_active=True).exclude(
+                pi_to_usd=rate, source=source
+            ).update(is_active=False)
+            if PiCoinRate.objects.filter(is_active=True, pi_to_usd=rate, source=source).exists():
+                self.stdout.write(f'Pi rate 1 π = ${rate} USD (source: {source}) is already active')
+                return
+            PiCoinRate.objects.create(
+                pi_to_usd=rate,
+                source=source,
+                is_active=True
+            )
         
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully initialized Pi rate: 1 π = ${rate} USD (source: {source})'
             )
         )
+
+    def import_csv(self, path, default_source, batch_size):
+        """Backfill historical rates with batched INSERTs in a single transaction"""
+        try:
+            with open(path, newline='') as handle, transaction.atomic():
+                rates = self.parse_rates(csv.DictReader(handle), default_source)
+                total = 0
+                while True:
+                    chunk = list(islice(rates, batch_size))
+                    if not chunk:
+                        break
+                    # auto_now_add stamps every row with the insert time, so put the
+                    # historical timestamps back by pk rather than toggling the field
+                    created_at = [rate.created_at for rate in chunk]
+                    PiCoinRate.objects.bulk_create(chunk, batch_size=batch_size)
+                    for rate, timestamp in zip(chunk, created_at):
+                        rate.created_at = timestamp
+                    PiCoinRate.objects.bulk_update(chunk, ['created_at'], batch_size=batch_size)
+                    total += len(chunk)
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully imported {total} Pi rates from {path}'))
+
+    def parse_rates(self, rows, default_source):
+        now = timezone.now()
+        for line, row in enumerate(rows, start=2):
+            try:
+                pi_to_usd = Decimal(row['pi_to_usd'])
+            except (KeyError, TypeError, InvalidOperation):
+                raise CommandError(f'Line {line}: invalid or missing pi_to_usd')
+            yield PiCoinRate(
+                pi_to_usd=pi_to_usd,
+                source=row.get('source') or default_source,
+                created_at=self.parse_created_at(row.get('created_at'), line) or now,
+                is_active=False,
+            )
+
+    def parse_created_at(self, value, line):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Line {line}: invalid created_at {value!r}')
+            parsed = datetime.combine(day, time.min)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_list_indexes'),
+        ('payments', '0006_create_missing_phone_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payments_pa_status_21ed42_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_method', '-created_at'], name='payments_pa_payment_b00c04_idx'),
+        ),
+    ]
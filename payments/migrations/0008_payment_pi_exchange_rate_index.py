@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_list_indexes'),
+        ('payments', '0007_payment_status_method_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['pi_exchange_rate'], name='payments_pa_pi_exch_589551_idx'),
+        ),
+    ]
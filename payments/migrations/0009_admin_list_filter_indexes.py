@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_list_indexes'),
+        ('payments', '0008_payment_pi_exchange_rate_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payments_pa_payment_11cbdd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='mpesab2ctransaction',
+            index=models.Index(fields=['-created_at'], name='payments_mp_created_ae2eb2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpesab2ctransaction',
+            index=models.Index(fields=['status', '-created_at'], name='payments_mp_status_32ff7f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpesac2btransaction',
+            index=models.Index(fields=['-created_at'], name='payments_mp_created_85e9cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpesac2btransaction',
+            index=models.Index(fields=['status', '-created_at'], name='payments_mp_status_cbffa1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_method', 'status', '-created_at'], name='payments_pa_payment_7b722d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonepayment',
+            index=models.Index(fields=['-created_at'], name='payments_ph_created_7b9c93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonepayment',
+            index=models.Index(fields=['status', '-created_at'], name='payments_ph_status_7fcbd4_idx'),
+        ),
+    ]
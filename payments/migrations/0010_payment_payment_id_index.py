@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_list_indexes'),
+        ('payments', '0009_admin_list_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_id'], name='payments_pa_payment_6c9e39_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:21
+
+import logging
+from decimal import ROUND_DOWN
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def round_fractional_amounts(apps, schema_editor):
+    """
+    Round stored amounts down to whole shillings, logging every row whose
+    value changes. Daraja was always sent int(amount), so rounding down
+    keeps the amount that was actually transacted.
+    """
+    for model_name in ('MpesaB2CTransaction', 'MpesaC2BTransaction', 'PhonePayment'):
+        model = apps.get_model('payments', model_name)
+        for pk, amount in model.objects.values_list('pk', 'amount').iterator():
+            whole = amount.to_integral_value(rounding=ROUND_DOWN)
+            if whole != amount:
+                logger.warning(
+                    '%s %s: amount %s rounded down to %s whole shillings',
+                    model_name, pk, amount, whole
+                )
+                model.objects.filter(pk=pk).update(amount=whole)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_payment_payment_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_fractional_amounts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='mpesab2ctransaction',
+            name='amount',
+            field=models.PositiveIntegerField(help_text='Whole KES; Daraja rejects fractional amounts'),
+        ),
+        migrations.AlterField(
+            model_name='mpesac2btransaction',
+            name='amount',
+            field=models.PositiveIntegerField(help_text='Whole KES; Daraja rejects fractional amounts'),
+        ),
+        migrations.AlterField(
+            model_name='phonepayment',
+            name='amount',
+            field=models.PositiveIntegerField(help_text='Whole KES; Daraja rejects fractional amounts'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_mpesa_whole_shilling_amounts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mpesab2ctransaction',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'initiated'])), fields=['-created_at'], name='b2c_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpesac2btransaction',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'initiated'])), fields=['-created_at'], name='c2b_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonepayment',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['-created_at'], name='phonepay_active_idx'),
+        ),
+    ]
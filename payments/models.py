@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils.functional import cached_property
 from orders.models import Order
 from decimal import Decimal
 import json
+import secrets
 
 class Payment(models.Model):
     PAYMENT_METHODS = [
@@ -48,13 +50,17 @@ class Payment(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['payment_method', 'status']),
+            models.Index(fields=['payment_method', 'status', '-created_at']),
             models.Index(fields=['pi_payment_id']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['payment_method', '-created_at']),
+            models.Index(fields=['pi_exchange_rate']),
+            models.Index(fields=['payment_id']),
         ]
 
     def __str__(self):
-        return f"Payment for Order #{self.order.id} - {self.status}"
+        return f"Payment for Order #{self.order_id} - {self.status}"
     
     @property
     def is_pi_payment(self):
@@ -75,7 +81,8 @@ class Payment(models.Model):
         return {}
     
     def set_gateway_response_data(self, data):
-        self.gateway_response = json.dumps(data, indent=2)
+        # Compact separators: indented JSON roughly doubled the stored size
+        self.gateway_response = json.dumps(data, separators=(',', ':'))
 
 
 class PiCoinRate(models.Model):
@@ -152,7 +159,7 @@ class MpesaB2CTransaction(models.Model):
     conversation_id = models.CharField(max_length=255, unique=True)
     originator_conversation_id = models.CharField(max_length=255, blank=True)
     phone_number = models.CharField(max_length=15)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.PositiveIntegerField(help_text="Whole KES; Daraja rejects fractional amounts")
     remarks = models.CharField(max_length=255)
     occasion = models.CharField(max_length=100, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -172,11 +179,18 @@ class MpesaB2CTransaction(models.Model):
         ordering = ['-created_at']
         verbose_name = "M-Pesa B2C Transaction"
         verbose_name_plural = "M-Pesa B2C Transactions"
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            # Only in-flight rows, so polling cost doesn't grow with history
+            models.Index(fields=['-created_at'], name='b2c_active_idx',
+                         condition=models.Q(status__in=['pending', 'initiated'])),
+        ]
     
     def __str__(self):
         return f"B2C to {self.phone_number} - KES {self.amount} ({self.status})"
     
-    @property
+    @cached_property
     def formatted_phone(self):
         """Return formatted phone number for display"""
         if self.phone_number.startswith('254'):
@@ -201,7 +215,7 @@ class MpesaC2BTransaction(models.Model):
     checkout_request_id = models.CharField(max_length=255, unique=True)
     merchant_request_id = models.CharField(max_length=255, blank=True)
     phone_number = models.CharField(max_length=15)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.PositiveIntegerField(help_text="Whole KES; Daraja rejects fractional amounts")
     account_reference = models.CharField(max_length=255)
     transaction_desc = models.CharField(max_length=255)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -216,11 +230,18 @@ class MpesaC2BTransaction(models.Model):
         ordering = ['-created_at']
         verbose_name = "M-Pesa C2B Transaction"
         verbose_name_plural = "M-Pesa C2B Transactions"
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            # Only in-flight rows, so polling cost doesn't grow with history
+            models.Index(fields=['-created_at'], name='c2b_active_idx',
+                         condition=models.Q(status__in=['pending', 'initiated'])),
+        ]
     
     def __str__(self):
         return f"C2B from {self.phone_number} - KES {self.amount} ({self.status})"
     
-    @property
+    @cached_property
     def formatted_phone(self):
         """Return formatted phone number for display"""
         if self.phone_number.startswith('254'):
@@ -257,7 +278,7 @@ class PhonePayment(models.Model):
     payment_type = models.CharField(max_length=20, choices=PAYMENT_TYPE_CHOICES)
     provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES, default='mpesa')
     phone_number = models.CharField(max_length=15)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.PositiveIntegerField(help_text="Whole KES; Daraja rejects fractional amounts")
     description = models.CharField(max_length=255)
     reference = models.CharField(max_length=100, unique=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -275,12 +296,19 @@ class PhonePayment(models.Model):
         ordering = ['-created_at']
         verbose_name = "Phone Payment"
         verbose_name_plural = "Phone Payments"
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            # Only in-flight rows, so polling cost doesn't grow with history
+            models.Index(fields=['-created_at'], name='phonepay_active_idx',
+                         condition=models.Q(status__in=['pending', 'processing'])),
+        ]
     
     def __str__(self):
         action = "to" if self.payment_type == 'send' else "from"
         return f"{self.get_payment_type_display()} {action} {self.phone_number} - KES {self.amount}"
     
-    @property
+    @cached_property
     def formatted_phone(self):
         """Return formatted phone number for display"""
         if self.phone_number.startswith('254'):
@@ -289,11 +317,10 @@ class PhonePayment(models.Model):
     
     def generate_reference(self):
         """Generate unique reference for the payment"""
-        import uuid
-        prefix = f"{self.payment_type.upper()}{self.provider.upper()}"
-        return f"{prefix}{uuid.uuid4().hex[:8].upper()}"
+        # 32 random bits, the same as the 8 hex chars previously sliced off a uuid4
+        return f"{self.payment_type.upper()}{self.provider.upper()}{secrets.token_hex(4).upper()}"
     
     def save(self, *args, **kwargs):
-        if not self.reference:
+        if self._state.adding and not self.reference:
             self.reference = self.generate_reference()
         super().save(*args, **kwargs)
@@ -1,12 +1,51 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import base64
-import json
+import hashlib
 import logging
-from datetime import datetime
+import re
+import time
+from functools import lru_cache
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Refresh the OAuth token this long before Daraja says it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# Seconds to wait on Safaricom before giving up, so a stuck connection can't
+# hold a worker indefinitely
+REQUEST_TIMEOUT = 10
+
+# Only one worker fetches a new token at a time; the others poll the cache for
+# it, giving up and fetching themselves after the lock would have expired
+TOKEN_LOCK_TIMEOUT = REQUEST_TIMEOUT
+TOKEN_LOCK_POLL_INTERVAL = 0.1
+
+_NON_DIGIT = re.compile(r'\D')
+
+
+def _build_session():
+    """
+    Session shared by every Daraja call so the TLS connection is kept alive
+    between requests. Retries only apply to idempotent methods (urllib3's
+    default), so a payment POST is never sent twice.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session = _build_session()
+
 class MpesaDarajaAPI:
     def __init__(self, consumer_key, consumer_secret, shortcode, passkey, base_url, initiator_name=None, security_credential=None):
         self.consumer_key = consumer_key
@@ -16,31 +55,105 @@ class MpesaDarajaAPI:
         self.base_url = base_url
         self.initiator_name = initiator_name or getattr(settings, 'MPESA_INITIATOR_NAME', '')
         self.security_credential = security_credential or getattr(settings, 'MPESA_SECURITY_CREDENTIAL', '')
-        self.access_token = self.get_access_token()
+        self._session = _session
+        # Result/timeout callbacks Daraja posts back to; built once per client
+        callback_base = f"{settings.SITE_URL.rstrip('/')}/payments/mpesa"
+        self._urls = {
+            'b2c_timeout': f"{callback_base}/b2c-timeout/",
+            'b2c_result': f"{callback_base}/b2c-result/",
+            'status_result': f"{callback_base}/status-result/",
+            'status_timeout': f"{callback_base}/status-timeout/",
+            'balance_timeout': f"{callback_base}/balance-timeout/",
+            'balance_result': f"{callback_base}/balance-result/",
+        }
+        # Static part of the STK push password; only the timestamp changes per call
+        self._stk_password_prefix = f"{shortcode}{passkey}".encode()
+        self._token_cache_key = 'mpesa_token:%s' % hashlib.md5(
+            f'{base_url}:{consumer_key}'.encode()
+        ).hexdigest()
 
-    def get_access_token(self):
-        """Get OAuth access token from Safaricom"""
+    @property
+    def access_token(self):
+        return self.get_access_token()
+
+    def get_access_token(self, rejected_token=None):
+        """
+        Get the OAuth access token, shared through the cache by every
+        instance using the same credentials until shortly before it expires.
+
+        Pass the token Daraja just refused as rejected_token to force a new
+        one. Concurrent refreshes are collapsed into a single OAuth request.
+        """
+        token = cache.get(self._token_cache_key)
+        if token and token != rejected_token:
+            return token
+
+        lock_key = f'{self._token_cache_key}:lock'
+        if cache.add(lock_key, 1, TOKEN_LOCK_TIMEOUT):
+            try:
+                return self._refresh_access_token()
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker is refreshing; wait for its token
+        deadline = time.monotonic() + TOKEN_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(TOKEN_LOCK_POLL_INTERVAL)
+            token = cache.get(self._token_cache_key)
+            if token and token != rejected_token:
+                return token
+        return self._refresh_access_token()
+
+    def _refresh_access_token(self):
+        token, expires_in = self._fetch_access_token()
+        cache.set(self._token_cache_key, token, max(expires_in - TOKEN_EXPIRY_MARGIN, 1))
+        return token
+
+    def _fetch_access_token(self):
+        """Request a new OAuth access token from Safaricom"""
         url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
         try:
-            response = requests.get(url, auth=(self.consumer_key, self.consumer_secret))
+            response = self._session.get(
+                url, auth=(self.consumer_key, self.consumer_secret), timeout=REQUEST_TIMEOUT
+            )
             response.raise_for_status()
             token_data = response.json()
             logger.info("Successfully obtained M-Pesa access token")
-            return token_data['access_token']
+            return token_data['access_token'], int(token_data.get('expires_in', 3599))
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get M-Pesa access token: {e}")
             raise
 
+    def _post(self, url, payload):
+        """POST with the current token, refreshing it once if Daraja rejects it"""
+        # json= sets the Content-Type header
+        token = self.access_token
+        response = self._session.post(
+            url, json=payload, headers={"Authorization": f"Bearer {token}"},
+            timeout=REQUEST_TIMEOUT
+        )
+        if response.status_code == 401:
+            response = self._session.post(
+                url, json=payload,
+                headers={"Authorization": f"Bearer {self.get_access_token(rejected_token=token)}"},
+                timeout=REQUEST_TIMEOUT
+            )
+        return response
+
+    def _call(self, path, payload, action):
+        """POST payload to a Daraja endpoint and return the decoded response"""
+        try:
+            response = self._post(f"{self.base_url}{path}", payload)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"{action} failed: {e}")
+            raise
+
     def stk_push(self, phone_number, amount, account_reference, transaction_desc, callback_url):
         """Initiate STK Push (Customer pays via their phone)"""
-        url = f"{self.base_url}/mpesa/stkpush/v1/processrequest"
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        password = base64.b64encode(f"{self.shortcode}{self.passkey}{timestamp}".encode()).decode()
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
+        timestamp = time.strftime('%Y%m%d%H%M%S', time.localtime())
+        password = base64.b64encode(self._stk_password_prefix + timestamp.encode()).decode()
         
         payload = {
             "BusinessShortCode": self.shortcode,
@@ -56,25 +169,12 @@ class MpesaDarajaAPI:
             "TransactionDesc": transaction_desc
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"STK Push initiated successfully: {result.get('CheckoutRequestID')}")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"STK Push failed: {e}")
-            raise
+        result = self._call("/mpesa/stkpush/v1/processrequest", payload, "STK Push")
+        logger.info(f"STK Push initiated successfully: {result.get('CheckoutRequestID')}")
+        return result
 
     def b2c_payment(self, phone_number, amount, remarks, occasion=None):
         """Send money directly to customer phone number (B2C)"""
-        url = f"{self.base_url}/mpesa/b2c/v1/paymentrequest"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "InitiatorName": self.initiator_name,
             "SecurityCredential": self.security_credential,
@@ -83,30 +183,17 @@ class MpesaDarajaAPI:
             "PartyA": self.shortcode,
             "PartyB": phone_number,
             "Remarks": remarks,
-            "QueueTimeOutURL": f"{settings.SITE_URL}/payments/mpesa/b2c-timeout/",
-            "ResultURL": f"{settings.SITE_URL}/payments/mpesa/b2c-result/",
+            "QueueTimeOutURL": self._urls['b2c_timeout'],
+            "ResultURL": self._urls['b2c_result'],
             "Occasion": occasion or remarks[:20]
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"B2C payment initiated: {result.get('ConversationID')}")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"B2C payment failed: {e}")
-            raise
+        result = self._call("/mpesa/b2c/v1/paymentrequest", payload, "B2C payment")
+        logger.info(f"B2C payment initiated: {result.get('ConversationID')}")
+        return result
 
     def c2b_register_urls(self, confirmation_url, validation_url):
         """Register C2B URLs for receiving payments"""
-        url = f"{self.base_url}/mpesa/c2b/v1/registerurl"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "ShortCode": self.shortcode,
             "ResponseType": "Completed",
@@ -114,25 +201,12 @@ class MpesaDarajaAPI:
             "ValidationURL": validation_url
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info("C2B URLs registered successfully")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"C2B URL registration failed: {e}")
-            raise
+        result = self._call("/mpesa/c2b/v1/registerurl", payload, "C2B URL registration")
+        logger.info("C2B URLs registered successfully")
+        return result
 
     def c2b_simulate_payment(self, phone_number, amount, bill_ref_number):
         """Simulate C2B payment for testing"""
-        url = f"{self.base_url}/mpesa/c2b/v1/simulate"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "ShortCode": self.shortcode,
             "CommandID": "CustomerPayBillOnline",
@@ -141,25 +215,12 @@ class MpesaDarajaAPI:
             "BillRefNumber": bill_ref_number
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"C2B simulation successful: {result}")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"C2B simulation failed: {e}")
-            raise
+        result = self._call("/mpesa/c2b/v1/simulate", payload, "C2B simulation")
+        logger.info(f"C2B simulation successful: {result}")
+        return result
 
     def transaction_status(self, transaction_id):
         """Check the status of a transaction"""
-        url = f"{self.base_url}/mpesa/transactionstatus/v1/query"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "Initiator": self.initiator_name,
             "SecurityCredential": self.security_credential,
@@ -167,31 +228,18 @@ class MpesaDarajaAPI:
             "TransactionID": transaction_id,
             "PartyA": self.shortcode,
             "IdentifierType": "4",
-            "ResultURL": f"{settings.SITE_URL}/payments/mpesa/status-result/",
-            "QueueTimeOutURL": f"{settings.SITE_URL}/payments/mpesa/status-timeout/",
+            "ResultURL": self._urls['status_result'],
+            "QueueTimeOutURL": self._urls['status_timeout'],
             "Remarks": "Transaction status query",
             "Occasion": "Status check"
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"Transaction status query initiated: {result}")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Transaction status query failed: {e}")
-            raise
+        result = self._call("/mpesa/transactionstatus/v1/query", payload, "Transaction status query")
+        logger.info(f"Transaction status query initiated: {result}")
+        return result
 
     def account_balance(self):
         """Check account balance"""
-        url = f"{self.base_url}/mpesa/accountbalance/v1/query"
-        
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "Initiator": self.initiator_name,
             "SecurityCredential": self.security_credential,
@@ -199,25 +247,20 @@ class MpesaDarajaAPI:
             "PartyA": self.shortcode,
             "IdentifierType": "4",
             "Remarks": "Account balance check",
-            "QueueTimeOutURL": f"{settings.SITE_URL}/payments/mpesa/balance-timeout/",
-            "ResultURL": f"{settings.SITE_URL}/payments/mpesa/balance-result/"
+            "QueueTimeOutURL": self._urls['balance_timeout'],
+            "ResultURL": self._urls['balance_result']
         }
         
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info("Account balance query initiated")
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Account balance query failed: {e}")
-            raise
+        result = self._call("/mpesa/accountbalance/v1/query", payload, "Account balance query")
+        logger.info("Account balance query initiated")
+        return result
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def format_phone_number(phone_number):
         """Format phone number to Kenyan format (254XXXXXXXXX)"""
         # Remove any non-digit characters
-        phone = ''.join(filter(str.isdigit, phone_number))
+        phone = _NON_DIGIT.sub('', phone_number)
         
         # Handle different formats
         if phone.startswith('0'):
@@ -231,11 +274,15 @@ class MpesaDarajaAPI:
         
         return phone
 
+    @staticmethod
+    def is_valid_formatted_phone(formatted):
+        """Check a number already passed through format_phone_number"""
+        return len(formatted) == 12 and formatted.startswith('254')
+
     @staticmethod
     def validate_phone_number(phone_number):
         """Validate Kenyan phone number format"""
-        formatted = MpesaDarajaAPI.format_phone_number(phone_number)
-        return len(formatted) == 12 and formatted.startswith('254')
+        return MpesaDarajaAPI.is_valid_formatted_phone(MpesaDarajaAPI.format_phone_number(phone_number))
 
 
 class MpesaPaymentProcessor:
@@ -251,12 +298,13 @@ class MpesaPaymentProcessor:
             initiator_name=getattr(settings, 'MPESA_INITIATOR_NAME', ''),
             security_credential=getattr(settings, 'MPESA_SECURITY_CREDENTIAL', '')
         )
+        self._stk_callback_url = f"{settings.SITE_URL.rstrip('/')}/payments/mpesa-callback/"
     
     def send_money_to_phone(self, phone_number, amount, description="Payment"):
         """Send money directly to a phone number"""
         formatted_phone = self.api.format_phone_number(phone_number)
         
-        if not self.api.validate_phone_number(formatted_phone):
+        if not self.api.is_valid_formatted_phone(formatted_phone):
             raise ValueError(f"Invalid phone number format: {phone_number}")
         
         return self.api.b2c_payment(
@@ -270,17 +318,15 @@ class MpesaPaymentProcessor:
         """Request payment from a phone number (STK Push)"""
         formatted_phone = self.api.format_phone_number(phone_number)
         
-        if not self.api.validate_phone_number(formatted_phone):
+        if not self.api.is_valid_formatted_phone(formatted_phone):
             raise ValueError(f"Invalid phone number format: {phone_number}")
         
-        callback_url = f"{settings.SITE_URL}/payments/mpesa-callback/"
-        
         return self.api.stk_push(
             phone_number=formatted_phone,
             amount=int(amount),
             account_reference=order_reference,
             transaction_desc=description,
-            callback_url=callback_url
+            callback_url=self._stk_callback_url
         )
 
 
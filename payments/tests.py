@@ -1,3 +1,162 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .models import MpesaB2CTransaction, PhonePayment
+from .mpesa import MpesaDarajaAPI
+
+
+class WholeShillingAmountTests(TestCase):
+    """Daraja only accepts whole shillings, so fractional amounts are refused up front"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pass', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def assert_rejected(self, url_name, data):
+        with mock.patch('payments.views.get_mpesa_processor') as get_processor:
+            response = self.client.post(reverse(url_name), data)
+
+        self.assertEqual(response.status_code, 200)
+        get_processor.assert_not_called()
+        self.assertFalse(PhonePayment.objects.exists())
+        self.assertIn(
+            'Amount must be a whole number of shillings',
+            [str(message) for message in get_messages(response.wsgi_request)]
+        )
+
+    def test_send_money_rejects_fractional_amount(self):
+        self.assert_rejected('payments:send_money_to_phone', {
+            'phone_number': '0712345678', 'amount': '10.50', 'description': 'Refund',
+        })
+
+    def test_request_payment_rejects_fractional_amount(self):
+        self.assert_rejected('payments:request_payment_from_phone', {
+            'phone_number': '0712345678', 'amount': '10.50', 'description': 'Invoice',
+        })
+
+
+class B2CResultCallbackTests(TestCase):
+    def setUp(self):
+        self.b2c_transaction = MpesaB2CTransaction.objects.create(
+            conversation_id='AG_20240101_0001',
+            phone_number='254712345678',
+            amount=100,
+            remarks='Refund',
+            status='initiated',
+        )
+        self.phone_payment = PhonePayment.objects.create(
+            payment_type='send',
+            phone_number='254712345678',
+            amount=100,
+            description='Refund',
+            status='processing',
+            mpesa_b2c=self.b2c_transaction,
+        )
+
+    def post_result(self, result_code='0', result_desc='Processed'):
+        payload = {
+            'Result': {
+                'ConversationID': self.b2c_transaction.conversation_id,
+                'ResultCode': result_code,
+                'ResultDesc': result_desc,
+                'ResultParameters': {
+                    'ResultParameter': [
+                        {'Key': 'TransactionID', 'Value': 'NLJ7RT61SV'},
+                        {'Key': 'TransactionReceipt', 'Value': 'NLJ7RT61SV'},
+                        {'Key': 'ReceiverPartyPublicName', 'Value': '254712345678 - Jane Doe'},
+                        {'Key': 'B2CWorkingAccountAvailableFunds', 'Value': '900.00'},
+                    ],
+                },
+            },
+        }
+        return self.client.post(
+            reverse('payments:mpesa_b2c_result_callback'),
+            data=json.dumps(payload),
+            content_type='application/json',
+        )
+
+    def test_success_updates_transaction_and_phone_payment(self):
+        response = self.post_result()
+
+        self.assertEqual(response.json()['ResultCode'], 0)
+        self.b2c_transaction.refresh_from_db()
+        self.phone_payment.refresh_from_db()
+        self.assertEqual(self.b2c_transaction.status, 'completed')
+        self.assertEqual(self.b2c_transaction.transaction_receipt, 'NLJ7RT61SV')
+        self.assertEqual(self.b2c_transaction.receiver_party_public_name, '254712345678 - Jane Doe')
+        self.assertEqual(self.phone_payment.status, 'completed')
+        self.assertEqual(self.phone_payment.receipt_number, 'NLJ7RT61SV')
+        self.assertIsNotNone(self.phone_payment.completed_at)
+
+    def test_failure_marks_both_failed(self):
+        self.post_result(result_code='2001', result_desc='The initiator information is invalid.')
+
+        self.b2c_transaction.refresh_from_db()
+        self.phone_payment.refresh_from_db()
+        self.assertEqual(self.b2c_transaction.status, 'failed')
+        self.assertEqual(self.b2c_transaction.response_code, '2001')
+        self.assertEqual(self.phone_payment.status, 'failed')
+
+    def test_transaction_error_rolls_back_phone_payment(self):
+        with mock.patch.object(MpesaB2CTransaction, 'save', side_effect=RuntimeError('database is locked')):
+            response = self.post_result()
+
+        self.assertEqual(response.json()['ResultCode'], 1)
+        self.phone_payment.refresh_from_db()
+        self.assertEqual(self.phone_payment.status, 'processing')
+        self.assertEqual(self.phone_payment.receipt_number, '')
+        self.assertIsNone(self.phone_payment.completed_at)
+
+
+class AccessTokenTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = MpesaDarajaAPI(
+            consumer_key='key', consumer_secret='secret', shortcode='174379',
+            passkey='passkey', base_url='https://sandbox.safaricom.co.ke',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_oauth_request(self):
+        def fetch():
+            # Hold the refresh open long enough for every caller to arrive
+            time.sleep(0.2)
+            return 'token-1', 3599
+
+        workers = 8
+        start = threading.Barrier(workers)
+        tokens = []
+
+        def call():
+            start.wait()
+            tokens.append(self.api.get_access_token())
+
+        with mock.patch.object(MpesaDarajaAPI, '_fetch_access_token', side_effect=fetch) as fetch_token:
+            threads = [threading.Thread(target=call) for _ in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(fetch_token.call_count, 1)
+        self.assertEqual(tokens, ['token-1'] * workers)
+
+    def test_rejected_token_is_refreshed(self):
+        with mock.patch.object(
+            MpesaDarajaAPI, '_fetch_access_token', side_effect=[('token-1', 3599), ('token-2', 3599)]
+        ) as fetch_token:
+            self.assertEqual(self.api.get_access_token(), 'token-1')
+            self.assertEqual(self.api.get_access_token(), 'token-1')
+            self.assertEqual(self.api.get_access_token(rejected_token='token-1'), 'token-2')
+
+        self.assertEqual(fetch_token.call_count, 2)
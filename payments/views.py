@@ -8,26 +8,42 @@ from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.conf import settings
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from datetime import datetime
 from decimal import Decimal
 import json
 import logging
 
 from orders.models import Order
-from .models import Payment, PiCoinRate, PiPaymentTransaction
-from .mpesa import MpesaDarajaAPI
+from .models import (
+    Payment, PiCoinRate, PiPaymentTransaction,
+    MpesaB2CTransaction, MpesaC2BTransaction, PhonePayment
+)
+from .mpesa import MpesaDarajaAPI, get_mpesa_processor
 from .pi_network import pi_processor, PiNetworkError
 
 logger = logging.getLogger(__name__)
 
+# Columns a B2C result callback can change; the rest of the row is left alone
+_B2C_RESULT_FIELDS = [
+    'status', 'response_code', 'response_description', 'transaction_id',
+    'transaction_receipt', 'receiver_party_public_name', 'transaction_completed_date_time',
+    'b2c_charges_paid_account_available_funds', 'b2c_utility_account_available_funds',
+    'b2c_working_account_available_funds', 'updated_at',
+]
+
 
 @staff_member_required
 def admin_payment_list(request):
-    payments = Payment.objects.all().order_by('-created_at')
-    pi_payments = payments.filter(payment_method='pi_coin')
+    payments = Payment.objects.select_related('order__user').order_by('-created_at')
+    # Both stat cards from a single COUNT pass
+    stats = Payment.objects.aggregate(
+        total=models.Count('id'),
+        pi=models.Count('id', filter=models.Q(payment_method='pi_coin')),
+    )
     return render(request, 'payments/admin_payment_list.html', {
         'payments': payments,
-        'pi_payments': pi_payments
+        'stats': stats
     })
 
 
@@ -68,14 +84,14 @@ def pi_rate_management(request):
         
         try:
             rate_decimal = Decimal(rate)
-            # Deactivate old rates
-            PiCoinRate.objects.filter(is_active=True).update(is_active=False)
-            # Create new rate
-            PiCoinRate.objects.create(
-                pi_to_usd=rate_decimal,
-                source=source,
-                is_active=True
-            )
+            # Deactivate old rates and create the new one in a single commit
+            with transaction.atomic():
+                PiCoinRate.objects.filter(is_active=True).update(is_active=False)
+                PiCoinRate.objects.create(
+                    pi_to_usd=rate_decimal,
+                    source=source,
+                    is_active=True
+                )
             messages.success(request, f'Pi coin rate updated to ${rate_decimal} USD')
         except (ValueError, TypeError):
             messages.error(request, 'Invalid rate value')
@@ -108,7 +124,6 @@ def pay_order_pi(request, order_id):
         current_rate = PiCoinRate.get_current_rate()
     except:
         # Create default rate if none exists
-        from decimal import Decimal
         PiCoinRate.objects.create(
             pi_to_usd=Decimal('0.314159'),
             source='default',
@@ -116,7 +131,8 @@ def pay_order_pi(request, order_id):
         )
         current_rate = PiCoinRate.get_current_rate()
     
-    pi_amount = PiCoinRate.convert_usd_to_pi(usd_amount)
+    # Convert with the rate already fetched (convert_usd_to_pi would re-query it)
+    pi_amount = Decimal(str(usd_amount)) / current_rate if current_rate > 0 else Decimal('0')
     
     if request.method == 'POST':
         payment_type = request.POST.get('payment_type', 'manual')
@@ -299,21 +315,20 @@ def check_pi_payment_status(request, payment_id):
 @csrf_exempt
 def mpesa_callback(request):
     # Handle M-Pesa payment confirmation callback
-    import json
     data = json.loads(request.body.decode('utf-8'))
     result = data.get('Body', {}).get('stkCallback', {})
     checkout_id = result.get('CheckoutRequestID')
     result_code = result.get('ResultCode')
     try:
-        from .models import Payment
-        payment = Payment.objects.get(payment_id=checkout_id)
-        if result_code == 0:
-            payment.status = 'completed'
-            payment.order.is_paid = True
-            payment.order.save()
-        else:
-            payment.status = 'failed'
-        payment.save()
+        payment = Payment.objects.select_related('order').get(payment_id=checkout_id)
+        with transaction.atomic():
+            if result_code == 0:
+                payment.status = 'completed'
+                payment.order.is_paid = True
+                payment.order.save(update_fields=['is_paid', 'updated_at'])
+            else:
+                payment.status = 'failed'
+            payment.save(update_fields=['status', 'updated_at'])
     except Payment.DoesNotExist:
         pass
     return JsonResponse({"ResultCode": 0, "ResultDesc": "Accepted"})
@@ -395,10 +410,9 @@ def payment_methods(request):
 @staff_member_required
 def phone_payment_dashboard(request):
     """Dashboard for managing phone payments"""
-    from .models import PhonePayment, MpesaB2CTransaction, MpesaC2BTransaction
     
     # Get recent phone payments
-    phone_payments = PhonePayment.objects.all()[:20]
+    phone_payments = PhonePayment.objects.select_related('initiated_by')[:20]
     
     # Get recent transactions
     b2c_transactions = MpesaB2CTransaction.objects.all()[:10]
@@ -429,8 +443,6 @@ def phone_payment_dashboard(request):
 @staff_member_required
 def send_money_to_phone(request):
     """Send money directly to a phone number"""
-    from .models import PhonePayment, MpesaB2CTransaction
-    from .mpesa import get_mpesa_processor
     
     if request.method == 'POST':
         phone_number = request.POST.get('phone_number', '').strip()
@@ -445,11 +457,13 @@ def send_money_to_phone(request):
             amount_decimal = Decimal(amount)
             if amount_decimal <= 0:
                 raise ValueError("Amount must be greater than 0")
+            if amount_decimal != amount_decimal.to_integral_value():
+                raise ValueError("Amount must be a whole number of shillings")
             
             # Format phone number
             mpesa_processor = get_mpesa_processor()
             formatted_phone = mpesa_processor.api.format_phone_number(phone_number)
-            if not mpesa_processor.api.validate_phone_number(formatted_phone):
+            if not mpesa_processor.api.is_valid_formatted_phone(formatted_phone):
                 raise ValueError("Invalid phone number format")
             
             # Create phone payment record
@@ -502,8 +516,6 @@ def send_money_to_phone(request):
 @staff_member_required  
 def request_payment_from_phone(request):
     """Request payment from a phone number via STK Push"""
-    from .models import PhonePayment, MpesaC2BTransaction
-    from .mpesa import get_mpesa_processor
     
     if request.method == 'POST':
         phone_number = request.POST.get('phone_number', '').strip()
@@ -519,11 +531,13 @@ def request_payment_from_phone(request):
             amount_decimal = Decimal(amount)
             if amount_decimal <= 0:
                 raise ValueError("Amount must be greater than 0")
+            if amount_decimal != amount_decimal.to_integral_value():
+                raise ValueError("Amount must be a whole number of shillings")
             
             # Format phone number
             mpesa_processor = get_mpesa_processor()
             formatted_phone = mpesa_processor.api.format_phone_number(phone_number)
-            if not mpesa_processor.api.validate_phone_number(formatted_phone):
+            if not mpesa_processor.api.is_valid_formatted_phone(formatted_phone):
                 raise ValueError("Invalid phone number format")
             
             # Create phone payment record
@@ -580,7 +594,6 @@ def request_payment_from_phone(request):
 @require_http_methods(["POST"])
 def mpesa_b2c_result_callback(request):
     """Handle M-Pesa B2C result callback"""
-    from .models import MpesaB2CTransaction
     
     try:
         data = json.loads(request.body)
@@ -592,70 +605,73 @@ def mpesa_b2c_result_callback(request):
         
         # Find the transaction
         try:
-            transaction = MpesaB2CTransaction.objects.get(conversation_id=conversation_id)
+            # One commit for the transaction and its phone payment
+            with transaction.atomic():
+                b2c_transaction = MpesaB2CTransaction.objects.select_related('phonepayment').get(
+                    conversation_id=conversation_id
+                )
             
-            # Update transaction status
-            if result_code == '0':
-                transaction.status = 'completed'
-                transaction.response_code = result_code
-                transaction.response_description = result_desc
+                # Update transaction status
+                if result_code == '0':
+                    b2c_transaction.status = 'completed'
+                    b2c_transaction.response_code = result_code
+                    b2c_transaction.response_description = result_desc
                 
-                # Extract additional details from result parameters
-                result_parameters = result.get('ResultParameters', {}).get('ResultParameter', [])
-                for param in result_parameters:
-                    key = param.get('Key', '')
-                    value = param.get('Value', '')
+                    # Extract additional details from result parameters
+                    result_parameters = result.get('ResultParameters', {}).get('ResultParameter', [])
+                    for param in result_parameters:
+                        key = param.get('Key', '')
+                        value = param.get('Value', '')
                     
-                    if key == 'TransactionID':
-                        transaction.transaction_id = value
-                    elif key == 'TransactionReceipt':
-                        transaction.transaction_receipt = value
-                    elif key == 'ReceiverPartyPublicName':
-                        transaction.receiver_party_public_name = value
-                    elif key == 'TransactionCompletedDateTime':
-                        from datetime import datetime
-                        try:
-                            transaction.transaction_completed_date_time = datetime.strptime(
-                                value, '%d.%m.%Y %H:%M:%S'
-                            )
-                        except:
-                            pass
-                    elif key == 'B2CChargesPaidAccountAvailableFunds':
-                        try:
-                            transaction.b2c_charges_paid_account_available_funds = Decimal(value)
-                        except:
-                            pass
-                    elif key == 'B2CUtilityAccountAvailableFunds':
-                        try:
-                            transaction.b2c_utility_account_available_funds = Decimal(value)
-                        except:
-                            pass
-                    elif key == 'B2CWorkingAccountAvailableFunds':
-                        try:
-                            transaction.b2c_working_account_available_funds = Decimal(value)
-                        except:
-                            pass
+                        if key == 'TransactionID':
+                            b2c_transaction.transaction_id = value
+                        elif key == 'TransactionReceipt':
+                            b2c_transaction.transaction_receipt = value
+                        elif key == 'ReceiverPartyPublicName':
+                            b2c_transaction.receiver_party_public_name = value
+                        elif key == 'TransactionCompletedDateTime':
+                            try:
+                                b2c_transaction.transaction_completed_date_time = datetime.strptime(
+                                    value, '%d.%m.%Y %H:%M:%S'
+                                )
+                            except:
+                                pass
+                        elif key == 'B2CChargesPaidAccountAvailableFunds':
+                            try:
+                                b2c_transaction.b2c_charges_paid_account_available_funds = Decimal(value)
+                            except:
+                                pass
+                        elif key == 'B2CUtilityAccountAvailableFunds':
+                            try:
+                                b2c_transaction.b2c_utility_account_available_funds = Decimal(value)
+                            except:
+                                pass
+                        elif key == 'B2CWorkingAccountAvailableFunds':
+                            try:
+                                b2c_transaction.b2c_working_account_available_funds = Decimal(value)
+                            except:
+                                pass
                 
-                # Update related phone payment
-                if hasattr(transaction, 'phonepayment'):
-                    phone_payment = transaction.phonepayment
-                    phone_payment.status = 'completed'
-                    phone_payment.receipt_number = transaction.transaction_receipt
-                    phone_payment.completed_at = timezone.now()
-                    phone_payment.save()
+                    # Update related phone payment
+                    if hasattr(b2c_transaction, 'phonepayment'):
+                        phone_payment = b2c_transaction.phonepayment
+                        phone_payment.status = 'completed'
+                        phone_payment.receipt_number = b2c_transaction.transaction_receipt
+                        phone_payment.completed_at = timezone.now()
+                        phone_payment.save(update_fields=['status', 'receipt_number', 'completed_at'])
                     
-            else:
-                transaction.status = 'failed'
-                transaction.response_code = result_code
-                transaction.response_description = result_desc
+                else:
+                    b2c_transaction.status = 'failed'
+                    b2c_transaction.response_code = result_code
+                    b2c_transaction.response_description = result_desc
                 
-                # Update related phone payment
-                if hasattr(transaction, 'phonepayment'):
-                    phone_payment = transaction.phonepayment
-                    phone_payment.status = 'failed'
-                    phone_payment.save()
+                    # Update related phone payment
+                    if hasattr(b2c_transaction, 'phonepayment'):
+                        phone_payment = b2c_transaction.phonepayment
+                        phone_payment.status = 'failed'
+                        phone_payment.save(update_fields=['status'])
             
-            transaction.save()
+                b2c_transaction.save(update_fields=_B2C_RESULT_FIELDS)
             logger.info(f"B2C transaction {conversation_id} updated: {result_desc}")
             
         except MpesaB2CTransaction.DoesNotExist:
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_auto_20250808_1817'),
+        ('stores', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-views_count'], name='products_pr_is_acti_49a9ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'price'], name='products_pr_is_acti_085b05_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-created_at'], name='products_pr_is_acti_645007_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentlyviewed',
+            index=models.Index(fields=['user', '-viewed_at'], name='products_re_user_id_a29a65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentlyviewed',
+            index=models.Index(fields=['product', '-viewed_at'], name='products_re_product_507201_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 11:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_recommendation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('product_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='products.product')),
+                ('product_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Product similarities',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['product_a', '-score'], name='products_pr_product_801247_idx')],
+                'unique_together': {('product_a', 'product_b')},
+            },
+        ),
+    ]
@@ -99,6 +99,14 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Hot filters/orderings used by core.recommendations
+        indexes = [
+            models.Index(fields=['is_active', '-views_count']),
+            models.Index(fields=['is_active', 'price']),
+            models.Index(fields=['is_active', '-created_at']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
@@ -192,11 +200,33 @@ class RecentlyViewed(models.Model):
     class Meta:
         unique_together = ['user', 'product']
         ordering = ['-viewed_at']
+        indexes = [
+            models.Index(fields=['user', '-viewed_at']),
+            models.Index(fields=['product', '-viewed_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} viewed {self.product.name}"
 
 
+class ProductSimilarity(models.Model):
+    """Precomputed item-item similarity, rebuilt offline by build_product_similarity"""
+    product_a = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similarities')
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Product similarities"
+        unique_together = ['product_a', 'product_b']
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['product_a', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_a_id} ~ {self.product_b_id} ({self.score:.3f})"
+
+
 class ProductQuestion(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='questions')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_questions')